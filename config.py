@@ -4,6 +4,9 @@ Trend Following Configuration
 """
 
 from datetime import datetime
+from functools import lru_cache
+import importlib.util
+import os
 import MetaTrader5 as mt5
 
 # MT5 Connection
@@ -13,6 +16,7 @@ MT5_SERVER = "FPMarkets-Demo"
 
 # Trading pair and timeframe
 SYMBOL = "EURUSD"
+SYMBOLS = [SYMBOL]  # Pairs run by main.py (one worker process each when more than one)
 TIMEFRAME = mt5.TIMEFRAME_H1
 TIMEFRAME_HTF = mt5.TIMEFRAME_H4  # Higher timeframe for DI filter
 
@@ -76,6 +80,16 @@ DATA_FOLDER = "Data"
 RESULTS_FOLDER = "results"
 LOGS_FOLDER = "logs"
 
+# Raw and processed data are stored as Parquet when pyarrow is installed, CSV otherwise
+DATA_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") else "csv"
+
+# In-memory dtype of OHLC prices ("float32" halves their memory traffic but can move setups that sit
+# exactly on a price comparison or a rounding boundary; float64 reproduces the raw data bit for bit)
+PRICE_DTYPE = "float64"
+
+# main.py --redownload auto: refresh raw data files older than this
+RAW_DATA_MAX_AGE_HOURS = 24
+
 
 def get_timeframe_string(timeframe=None):
     """Get timeframe string for given or current TIMEFRAME"""
@@ -84,16 +98,26 @@ def get_timeframe_string(timeframe=None):
     return TIMEFRAME_MAP.get(timeframe, "H1")
 
 
-def get_raw_data_file(timeframe=None):
-    """Generate raw data filename"""
+def get_raw_data_file(timeframe=None, symbol=None):
+    """Generate raw data filename (for the given or current SYMBOL)"""
     tf_str = get_timeframe_string(timeframe)
-    return f"{DATA_FOLDER}/{SYMBOL}_{tf_str}_raw.csv"
+    return f"{DATA_FOLDER}/{symbol or SYMBOL}_{tf_str}_raw.{DATA_FORMAT}"
+
+
+def find_raw_data_file(timeframe=None, symbol=None):
+    """Existing raw data file (current format first, then a legacy CSV), or None"""
+    raw_file = get_raw_data_file(timeframe, symbol)
+    legacy_file = os.path.splitext(raw_file)[0] + ".csv"
+    for path in (raw_file, legacy_file):
+        if os.path.exists(path):
+            return path
+    return None
 
 
 def get_processed_file(timeframe=None):
     """Generate processed data filename (with all indicators)"""
     tf_str = get_timeframe_string(timeframe)
-    return f"{RESULTS_FOLDER}/{SYMBOL}_{tf_str}_processed.csv"
+    return f"{RESULTS_FOLDER}/{SYMBOL}_{tf_str}_processed.{DATA_FORMAT}"
 
 
 def get_results_file(start_date, end_date):
@@ -105,16 +129,20 @@ def get_results_file(start_date, end_date):
 
 
 # Pip factor detection
+TWO_DECIMAL_PAIRS = frozenset({
+    "USDJPY", "EURJPY", "GBPJPY", "AUDJPY", "CHFJPY", "CADJPY", "NZDJPY"
+})
+
+
+@lru_cache(maxsize=64)
 def get_pip_factor(symbol):
     """Get pip conversion factor based on symbol"""
-    two_decimal_pairs = [
-        "USDJPY", "EURJPY", "GBPJPY", "AUDJPY", "CHFJPY", "CADJPY", "NZDJPY"
-    ]
-    return 100 if symbol.upper() in two_decimal_pairs else 10000
+    return 100 if symbol.upper() in TWO_DECIMAL_PAIRS else 10000
 
 
+@lru_cache(maxsize=64)
 def get_symbol_info(symbol):
-    """Get complete symbol information"""
+    """Get complete symbol information (cached, shared dict - do not mutate)"""
     pip_factor = get_pip_factor(symbol)
     decimals = 2 if pip_factor == 100 else 4
     description = "JPY pair (2 decimals)" if pip_factor == 100 else "Major pair (4 decimals)"
@@ -0,0 +1,119 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True, language_level=3
+"""
+ARMS v1.0 - Compiled Trade Simulation (Cython)
+Used by setup_detector when numba is not installed
+
+Build in place (optional):
+    cythonize -i core/_simulate_trade.pyx
+"""
+
+from libc.math cimport isnan
+
+# Same codes as core.setup_detector
+cdef enum:
+    LONG = 1
+    EXIT_SL = 0
+    EXIT_TP_ATR = 1
+    EXIT_BE = 2
+    EXIT_CROSS = 3
+    EXIT_EOD = 4
+
+
+def simulate_trade(Py_ssize_t entry_idx, int direction, double entry_price, double sl_price,
+                   const double[:] high, const double[:] low, const double[:] close,
+                   const double[:] ema20, const double[:] atr, const signed char[:] cross_dir,
+                   bint use_tp_atr, double tp_atr_multiplier, bint use_be_atr, double be_atr_multiplier):
+    """
+    Simulate one trade forward from entry_idx (same rules as _simulate_trade_loop)
+
+    Returns:
+        (exit_idx, exit_type, exit_price); EXIT_EOD at the last candle if no exit
+    """
+    cdef Py_ssize_t n = close.shape[0]
+    cdef Py_ssize_t j
+    cdef Py_ssize_t armed_at = n
+    cdef int d = direction
+    cdef double ema20_j, atr_j, tp_target, retroceso
+
+    # Phase 1: until a deep retracement arms the break even
+    for j in range(entry_idx, n):
+        # PRIORITY 1: Stop Loss
+        if d == LONG:
+            if low[j] <= sl_price:
+                return j, EXIT_SL, sl_price
+        else:
+            if high[j] >= sl_price:
+                return j, EXIT_SL, sl_price
+
+        if j == entry_idx:
+            continue
+
+        # PRIORITY 2: TP ATR (exit at target price, not high/low)
+        if use_tp_atr:
+            ema20_j = ema20[j]
+            atr_j = atr[j]
+            if not isnan(ema20_j) and not isnan(atr_j) and atr_j > 0:
+                if d == LONG:
+                    tp_target = ema20_j + tp_atr_multiplier * atr_j
+                    if high[j] >= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+                else:
+                    tp_target = ema20_j - tp_atr_multiplier * atr_j
+                    if low[j] <= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+
+        # PRIORITY 3: BE ATR (arm on deep retracement, resume in phase 2 on this candle)
+        if use_be_atr:
+            atr_j = atr[j]
+            if atr_j > 0 and not isnan(atr_j):
+                if d == LONG:
+                    retroceso = (entry_price - low[j]) / atr_j
+                else:
+                    retroceso = (high[j] - entry_price) / atr_j
+                if retroceso >= be_atr_multiplier:
+                    armed_at = j
+                    break
+
+        # PRIORITY 4: EMA cross reversal
+        if cross_dir[j] == -d:
+            return j, EXIT_CROSS, close[j]
+
+    # Phase 2: break even armed, only the return to entry is left to check for BE
+    for j in range(armed_at, n):
+        # PRIORITY 1: Stop Loss
+        if d == LONG:
+            if low[j] <= sl_price:
+                return j, EXIT_SL, sl_price
+        else:
+            if high[j] >= sl_price:
+                return j, EXIT_SL, sl_price
+
+        # PRIORITY 2: TP ATR
+        if use_tp_atr:
+            ema20_j = ema20[j]
+            atr_j = atr[j]
+            if not isnan(ema20_j) and not isnan(atr_j) and atr_j > 0:
+                if d == LONG:
+                    tp_target = ema20_j + tp_atr_multiplier * atr_j
+                    if high[j] >= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+                else:
+                    tp_target = ema20_j - tp_atr_multiplier * atr_j
+                    if low[j] <= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+
+        # PRIORITY 3: BE ATR (return to entry)
+        atr_j = atr[j]
+        if atr_j > 0 and not isnan(atr_j):
+            if d == LONG:
+                if high[j] >= entry_price:
+                    return j, EXIT_BE, entry_price
+            else:
+                if low[j] <= entry_price:
+                    return j, EXIT_BE, entry_price
+
+        # PRIORITY 4: EMA cross reversal
+        if cross_dir[j] == -d:
+            return j, EXIT_CROSS, close[j]
+
+    return n - 1, EXIT_EOD, close[n - 1]
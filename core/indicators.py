@@ -2,8 +2,184 @@
 ARMS v1.0 - Technical Indicators
 """
 
+import sys
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+from scipy.signal import lfilter
+from core._njit import njit, NUMBA_AVAILABLE
+
+try:
+    import talib
+except ImportError:
+    talib = None
+    import pandas_ta as ta
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+# Output column order, the same for every backend (TA-Lib, fused numba, pandas_ta/numpy)
+INDICATOR_COLUMNS = ('ema20', 'ema50', 'ema200', 'atr', 'adx', 'plus_di', 'minus_di',
+                     'rsi', 'macd', 'macd_signal', 'macd_histogram', 'volume_sma')
+
+
+def _ewm(x, alpha):
+    """Recursive EMA y[t] = alpha*x[t] + (1-alpha)*y[t-1], seeded with y[0] = x[0]"""
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * x[0]])
+    return y
+
+
+def _ema(x, period, alpha=None):
+    """
+    EMA seeded with the SMA of the first `period` values (TA-Lib convention)
+
+    alpha defaults to 2/(period+1); Wilder smoothing uses 1/period.
+    """
+    if alpha is None:
+        alpha = 2.0 / (period + 1)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        seeded = x[period - 1:].astype(np.float64)
+        seeded[0] = x[:period].mean()
+        out[period - 1:] = _ewm(seeded, alpha)
+    return out
+
+
+def _true_range(high, low, close):
+    """True range; the first candle (no previous close) uses high - low"""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+
+    # fmax skips the missing previous close on the first candle
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def _adx(high, low, close, period):
+    """Wilder +DI / -DI / ADX on arrays (TA-Lib seeding: DI from `period`, ADX from 2*period-1)"""
+    n = len(close)
+    adx = np.full(n, np.nan)
+    plus_di = np.full(n, np.nan)
+    minus_di = np.full(n, np.nan)
+    if n <= period:
+        return adx, plus_di, minus_di
+
+    up = np.diff(high)
+    dn = -np.diff(low)
+    plus_dm = np.where((up > dn) & (up > 0), up, 0.0)
+    minus_dm = np.where((dn > up) & (dn > 0), dn, 0.0)
+    tr = _true_range(high, low, close)[1:]
+
+    # Wilder smoothing seeded with the first period-1 moves; the 1/period scale cancels in the ratios
+    def smooth(x):
+        seeded = x[period - 2:].copy()
+        seeded[0] = x[:period - 1].sum() / period
+        return _ewm(seeded, 1.0 / period)[1:]
+
+    tr_s = smooth(tr)
+    has_range = tr_s != 0
+    plus_di[period:] = np.divide(100.0 * smooth(plus_dm), tr_s, out=np.zeros_like(tr_s), where=has_range)
+    minus_di[period:] = np.divide(100.0 * smooth(minus_dm), tr_s, out=np.zeros_like(tr_s), where=has_range)
+
+    di_sum = plus_di[period:] + minus_di[period:]
+    dx = np.divide(100.0 * np.abs(plus_di[period:] - minus_di[period:]), di_sum,
+                   out=np.zeros_like(di_sum), where=di_sum != 0)
+    adx[period:] = _ema(dx, period, 1.0 / period)
+    return adx, plus_di, minus_di
+
+
+@njit(cache=True, nogil=True)
+def _fused_indicators(close, ema_periods, rsi_period, macd_signal):
+    """
+    EMAs, RSI and MACD in a single pass over close
+
+    The last two entries of ema_periods are the MACD fast and slow EMAs.
+    EMAs are seeded with the SMA of their first `period` values and RSI with
+    Wilder's SMA of the first `rsi_period` changes (TA-Lib convention).
+
+    Returns:
+        (n, len(ema_periods) + 4) array: one column per EMA period, then
+        rsi, macd, macd_signal, macd_histogram (NaN during warm-up)
+    """
+    n = len(close)
+    k = len(ema_periods)
+    out = np.full((n, k + 4), np.nan)
+
+    alphas = 2.0 / (ema_periods + 1.0)
+    ema = np.zeros(k)
+    fast, slow = k - 2, k - 1
+    macd_start = max(ema_periods[fast], ema_periods[slow]) - 1
+
+    signal_alpha = 2.0 / (macd_signal + 1.0)
+    signal = 0.0
+    n_macd = 0
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+
+    for i in range(n):
+        c = close[i]
+
+        # EMA accumulators (running sum during warm-up, then recursion)
+        for j in range(k):
+            period = ema_periods[j]
+            if i < period - 1:
+                ema[j] += c
+            elif i == period - 1:
+                ema[j] = (ema[j] + c) / period
+                out[i, j] = ema[j]
+            else:
+                ema[j] += alphas[j] * (c - ema[j])
+                out[i, j] = ema[j]
+
+        # RSI (Wilder gain/loss accumulators)
+        if i > 0:
+            diff = c - close[i - 1]
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+            if i <= rsi_period:
+                avg_gain += gain
+                avg_loss += loss
+                if i == rsi_period:
+                    avg_gain /= rsi_period
+                    avg_loss /= rsi_period
+            else:
+                avg_gain = (avg_gain * (rsi_period - 1) + gain) / rsi_period
+                avg_loss = (avg_loss * (rsi_period - 1) + loss) / rsi_period
+            if i >= rsi_period:
+                total = avg_gain + avg_loss
+                out[i, k] = 100.0 * avg_gain / total if total != 0.0 else 0.0
+
+        # MACD line and signal EMA
+        if i >= macd_start:
+            macd = ema[fast] - ema[slow]
+            out[i, k + 1] = macd
+            n_macd += 1
+            if n_macd < macd_signal:
+                signal += macd
+            else:
+                if n_macd == macd_signal:
+                    signal = (signal + macd) / macd_signal
+                else:
+                    signal += signal_alpha * (macd - signal)
+                out[i, k + 2] = signal
+                out[i, k + 3] = macd - signal
+
+    return out
+
+
+@dataclass
+class IndicatorState:
+    """Last values and Wilder accumulators needed to extend indicators by one bar"""
+    close_prev: float
+    ema20_prev: float
+    ema50_prev: float
+    ema200_prev: float
+    atr_prev: float  # Before ATR adjustment
+    rsi_avg_gain: float
+    rsi_avg_loss: float
+    macd_fast_prev: float
+    macd_slow_prev: float
+    macd_signal_prev: float
 
 
 class IndicatorCalculator:
@@ -23,40 +199,81 @@ class IndicatorCalculator:
         self.macd_signal = macd_signal
         self.volume_sma = volume_sma
         self.atr_adjustment = atr_adjustment
+        self.state = None
 
     def calculate_ema(self, df):
         """Calculate EMAs (20, 50, 200)"""
-        df['ema20'] = ta.ema(df['close'], length=self.ema_period)
-        df['ema50'] = ta.ema(df['close'], length=self.ema_mid)
-        df['ema200'] = ta.ema(df['close'], length=self.ema_long)
+        close = df['close'].to_numpy(dtype=np.float64)
+        ema = talib.EMA if talib is not None else _ema
+        periods = (self.ema_period, self.ema_mid, self.ema_long)
+
+        # Fill one (n, 3) block and assign the three columns at once
+        out = np.empty((len(close), len(periods)))
+        for k, period in enumerate(periods):
+            out[:, k] = ema(close, period)
+        df[['ema20', 'ema50', 'ema200']] = out
+        return df
+
+    def calculate_fused(self, df):
+        """Calculate EMAs, RSI and MACD in one fused pass over close (numba)"""
+        close = df['close'].to_numpy(dtype=np.float64)
+        ema_periods = np.array([self.ema_period, self.ema_mid, self.ema_long,
+                                self.macd_fast, self.macd_slow], dtype=np.int64)
+        out = _fused_indicators(close, ema_periods, self.rsi_period, self.macd_signal)
+
+        # Drop the MACD fast/slow EMA columns (internal to MACD)
+        cols = ['ema20', 'ema50', 'ema200', 'rsi', 'macd', 'macd_signal', 'macd_histogram']
+        df[cols] = out[:, [0, 1, 2, 5, 6, 7, 8]]
         return df
 
     def calculate_atr(self, df):
         """Calculate ATR using Wilder's method"""
-        tr1 = df['high'] - df['low']
-        tr2 = abs(df['high'] - df['close'].shift())
-        tr3 = abs(df['low'] - df['close'].shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        
-        atr = tr.ewm(alpha=1 / self.atr_period, min_periods=self.atr_period, adjust=False).mean()
-        df['atr'] = atr * self.atr_adjustment
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        tr = _true_range(high, low, close)
+
+        atr = _ewm(tr, 1.0 / self.atr_period)
+        atr[:self.atr_period - 1] = np.nan
+        atr *= self.atr_adjustment
+        df['atr'] = atr
         return df
 
     def calculate_adx(self, df):
         """Calculate ADX and Directional Indicators"""
-        adx_df = ta.adx(df['high'], df['low'], df['close'], length=self.adx_period)
-        df['adx'] = adx_df[f'ADX_{self.adx_period}']
-        df['plus_di'] = adx_df[f'DMP_{self.adx_period}']
-        df['minus_di'] = adx_df[f'DMN_{self.adx_period}']
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        if talib is not None:
+            df['adx'] = talib.ADX(high, low, close, timeperiod=self.adx_period)
+            df['plus_di'] = talib.PLUS_DI(high, low, close, timeperiod=self.adx_period)
+            df['minus_di'] = talib.MINUS_DI(high, low, close, timeperiod=self.adx_period)
+            return df
+
+        df['adx'], df['plus_di'], df['minus_di'] = _adx(high, low, close, self.adx_period)
         return df
 
     def calculate_rsi(self, df):
         """Calculate RSI"""
+        if talib is not None:
+            close = df['close'].to_numpy(dtype=np.float64)
+            df['rsi'] = talib.RSI(close, timeperiod=self.rsi_period)
+            return df
+
         df['rsi'] = ta.rsi(df['close'], length=self.rsi_period)
         return df
 
     def calculate_macd(self, df):
         """Calculate MACD"""
+        if talib is not None:
+            close = df['close'].to_numpy(dtype=np.float64)
+            macd, signal, histogram = talib.MACD(close, fastperiod=self.macd_fast,
+                                                 slowperiod=self.macd_slow, signalperiod=self.macd_signal)
+            df['macd'] = macd
+            df['macd_signal'] = signal
+            df['macd_histogram'] = histogram
+            return df
+
         macd_df = ta.macd(df['close'], fast=self.macd_fast, slow=self.macd_slow, signal=self.macd_signal)
         df['macd'] = macd_df[f'MACD_{self.macd_fast}_{self.macd_slow}_{self.macd_signal}']
         df['macd_signal'] = macd_df[f'MACDs_{self.macd_fast}_{self.macd_slow}_{self.macd_signal}']
@@ -65,33 +282,144 @@ class IndicatorCalculator:
 
     def calculate_volume(self, df):
         """Calculate volume SMA"""
+        if talib is not None:
+            volume = df['volume'].to_numpy(dtype=np.float64)
+            df['volume_sma'] = talib.SMA(volume, timeperiod=self.volume_sma)
+            return df
+
         df['volume_sma'] = ta.sma(df['volume'], length=self.volume_sma)
         return df
 
-    def calculate_all_indicators(self, df):
-        """Calculate all technical indicators"""
-        print("\n📊 Calculating indicators...")
-        
-        df = df.copy()
-        df = self.calculate_ema(df)
-        df = self.calculate_atr(df)
-        df = self.calculate_adx(df)
-        df = self.calculate_rsi(df)
-        df = self.calculate_macd(df)
-        df = self.calculate_volume(df)
-        
+    def calculate_all_indicators(self, df, timeframe_name=None):
+        """
+        Calculate all technical indicators
+
+        Args:
+            df: DataFrame or dict of column arrays (SoA) with open/high/low/close/volume
+            timeframe_name: Label for the progress lines (e.g. "H1")
+
+        Returns:
+            DataFrame with the input columns plus the indicators, warm-up rows removed
+        """
+        # Single-write progress lines, labelled: H1 and H4 may be calculated at the same time
+        label = f"{timeframe_name} " if timeframe_name else ""
+        sys.stdout.write(f"\n📊 Calculating {label}indicators...\n")
+
+        if isinstance(df, dict):
+            df = pd.DataFrame(df, copy=False)
+
+        # SoA working frame: every indicator reads the same contiguous float64 arrays (converted once)
+        work = pd.DataFrame({
+            col: np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)) for col in OHLCV_COLUMNS
+        }, index=df.index, copy=False)
+        if talib is None and NUMBA_AVAILABLE:
+            # Without TA-Lib, one fused numba pass replaces the pandas_ta EMA/RSI/MACD calls
+            work = self.calculate_fused(work)
+            work = self.calculate_atr(work)
+            work = self.calculate_adx(work)
+        else:
+            work = self.calculate_ema(work)
+            work = self.calculate_atr(work)
+            work = self.calculate_adx(work)
+            work = self.calculate_rsi(work)
+            work = self.calculate_macd(work)
+        work = self.calculate_volume(work)
+
+        # Reassemble once: input columns (original dtypes) followed by the indicator columns
+        # (indicators already on the input, e.g. a processed frame, are replaced)
+        indicator_columns = list(INDICATOR_COLUMNS)
+        df = pd.concat([df.drop(columns=indicator_columns, errors='ignore'), work[indicator_columns]], axis=1)
+
+        # Indicators are only NaN during warm-up: cut at the longest NaN prefix
+        # (a column that is NaN everywhere, e.g. EMA200 on a short history, leaves no rows)
         initial_rows = len(df)
-        df = df.dropna()
+        first_valid = 0
+        for col in indicator_columns:
+            valid = ~np.isnan(df[col].to_numpy(dtype=np.float64))
+            idx = int(np.argmax(valid))
+            first_valid = max(first_valid, idx if valid[idx] else len(valid))
+        df = df.iloc[first_valid:]
         removed_rows = initial_rows - len(df)
         
-        print(f"✅ Indicators calculated: {len(df)} valid candles ({removed_rows} removed)")
+        sys.stdout.write(f"✅ {label}Indicators calculated: {len(df)} valid candles ({removed_rows} removed)\n")
         return df
 
-    def get_indicator_summary(self, df):
-        """Display indicator summary"""
-        print("\n" + "=" * 60)
-        print("INDICATOR SUMMARY")
-        print("=" * 60)
+    def init_state(self, df):
+        """Seed the streaming state from OHLC history (one bulk pass)"""
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+
+        diff = np.diff(close)
+        macd_line = _ema(close, self.macd_fast) - _ema(close, self.macd_slow)
+        macd_line = macd_line[~np.isnan(macd_line)]
+
+        self.state = IndicatorState(
+            close_prev=close[-1],
+            ema20_prev=_ema(close, self.ema_period)[-1],
+            ema50_prev=_ema(close, self.ema_mid)[-1],
+            ema200_prev=_ema(close, self.ema_long)[-1],
+            atr_prev=_ewm(_true_range(high, low, close), 1.0 / self.atr_period)[-1],
+            rsi_avg_gain=_ema(np.maximum(diff, 0.0), self.rsi_period, 1.0 / self.rsi_period)[-1],
+            rsi_avg_loss=_ema(np.maximum(-diff, 0.0), self.rsi_period, 1.0 / self.rsi_period)[-1],
+            macd_fast_prev=_ema(close, self.macd_fast)[-1],
+            macd_slow_prev=_ema(close, self.macd_slow)[-1],
+            macd_signal_prev=_ema(macd_line, self.macd_signal)[-1]
+        )
+        return self.state
+
+    def update(self, high, low, close):
+        """
+        Extend indicators by one new bar in O(1) (live mode)
+
+        Bulk backtests keep using calculate_all_indicators; ADX/DI and
+        volume SMA are not maintained incrementally.
+
+        Returns:
+            dict with ema20, ema50, ema200, atr, rsi, macd, macd_signal, macd_histogram
+        """
+        st = self.state
+        if st is None:
+            print("❌ Indicator state not initialized (call init_state first)")
+            return None
+
+        st.ema20_prev += 2.0 / (self.ema_period + 1) * (close - st.ema20_prev)
+        st.ema50_prev += 2.0 / (self.ema_mid + 1) * (close - st.ema50_prev)
+        st.ema200_prev += 2.0 / (self.ema_long + 1) * (close - st.ema200_prev)
+
+        # Wilder recursions
+        tr = max(high - low, abs(high - st.close_prev), abs(low - st.close_prev))
+        st.atr_prev = (st.atr_prev * (self.atr_period - 1) + tr) / self.atr_period
+
+        diff = close - st.close_prev
+        n = self.rsi_period
+        st.rsi_avg_gain = (st.rsi_avg_gain * (n - 1) + max(diff, 0.0)) / n
+        st.rsi_avg_loss = (st.rsi_avg_loss * (n - 1) + max(-diff, 0.0)) / n
+        total = st.rsi_avg_gain + st.rsi_avg_loss
+        rsi = 100.0 * st.rsi_avg_gain / total if total != 0 else 0.0
+
+        st.macd_fast_prev += 2.0 / (self.macd_fast + 1) * (close - st.macd_fast_prev)
+        st.macd_slow_prev += 2.0 / (self.macd_slow + 1) * (close - st.macd_slow_prev)
+        macd = st.macd_fast_prev - st.macd_slow_prev
+        st.macd_signal_prev += 2.0 / (self.macd_signal + 1) * (macd - st.macd_signal_prev)
+
+        st.close_prev = close
+
+        return {
+            'ema20': st.ema20_prev,
+            'ema50': st.ema50_prev,
+            'ema200': st.ema200_prev,
+            'atr': st.atr_prev * self.atr_adjustment,
+            'rsi': rsi,
+            'macd': macd,
+            'macd_signal': st.macd_signal_prev,
+            'macd_histogram': macd - st.macd_signal_prev
+        }
+
+    def get_indicator_summary(self, df, timeframe_name=None):
+        """Display indicator summary (written at once, so concurrent summaries do not interleave)"""
+        title = f"INDICATOR SUMMARY - {timeframe_name}" if timeframe_name else "INDICATOR SUMMARY"
+        lines = ["\n" + "=" * 60, title, "=" * 60]
         
         indicators = {
             'EMA20': 'ema20',
@@ -109,4 +437,5 @@ class IndicatorCalculator:
         
         for name, col in indicators.items():
             if col in df.columns:
-                print(f"{name}: Min {df[col].min():.3f} | Max {df[col].max():.3f} | Last {df[col].iloc[-1]:.3f}")
+                lines.append(f"{name}: Min {df[col].min():.3f} | Max {df[col].max():.3f} | Last {df[col].iloc[-1]:.3f}")
+        sys.stdout.write("\n".join(lines) + "\n")
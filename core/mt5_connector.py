@@ -3,93 +3,147 @@ ARMS v1.0 - MT5 Connection and Data Download
 """
 
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
+import sys
+import threading
+import config
+
+
+def _log(message):
+    """Print one line with a single write (lines from concurrent downloads stay apart)"""
+    sys.stdout.write(message + "\n")
 
 
 class MT5Connector:
     """MT5 connection and data download handler"""
 
+    # The MT5 terminal session is process-wide: connectors share it and the last one out shuts it down
+    _session_lock = threading.Lock()
+    _session_refs = 0
+
     def __init__(self):
         self.connected = False
 
     def initialize(self, login=None, password="", server=""):
-        """Initialize MT5 connection"""
-        if not mt5.initialize():
-            print(f"❌ Error initializing MT5: {mt5.last_error()}")
-            return False
-
-        if login is not None:
-            if not mt5.login(login, password, server):
-                print(f"❌ Login error: {mt5.last_error()}")
-                mt5.shutdown()
-                return False
+        """Initialize MT5 connection (shared with the other connectors of this process)"""
+        if self.connected:
+            return True
+
+        with MT5Connector._session_lock:
+            if MT5Connector._session_refs == 0:
+                if not mt5.initialize():
+                    _log(f"❌ Error initializing MT5: {mt5.last_error()}")
+                    return False
+
+                if login is not None:
+                    if not mt5.login(login, password, server):
+                        _log(f"❌ Login error: {mt5.last_error()}")
+                        mt5.shutdown()
+                        return False
+
+            MT5Connector._session_refs += 1
 
         self.connected = True
         account_info = mt5.account_info()
         if account_info:
-            print(f"✅ Connected to MT5 - Account: {account_info.login} | Server: {account_info.server}")
+            _log(f"✅ Connected to MT5 - Account: {account_info.login} | Server: {account_info.server}")
 
         return True
 
     def download_historical_data(self, symbol, timeframe, start_date, end_date):
         """Download historical data from MT5"""
         if not self.connected:
-            print("❌ No MT5 connection")
+            _log("❌ No MT5 connection")
             return None
 
-        print(f"📊 Downloading {symbol} from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-
-        rates = mt5.copy_rates_range(symbol, timeframe, start_date, end_date)
-
-        if rates is None or len(rates) == 0:
-            print(f"❌ Download error: {mt5.last_error()}")
+        tf_str = config.get_timeframe_string(timeframe)
+        _log(f"📊 Downloading {symbol} {tf_str} from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+
+        # Page the request in monthly windows (a single huge request can be truncated by MT5)
+        month_starts = pd.date_range(start_date, end_date, freq='MS').to_pydatetime().tolist()
+        edges = [start_date] + [m for m in month_starts if start_date < m < end_date] + [end_date]
+
+        chunks = []
+        failed_windows = 0
+        last_time = None
+        for window_start, window_end in zip(edges[:-1], edges[1:]):
+            chunk = mt5.copy_rates_range(symbol, timeframe, window_start, window_end)
+            if chunk is None:
+                failed_windows += 1
+                continue
+            # Windows are inclusive at both ends: drop bars already received with the previous window
+            if last_time is not None:
+                chunk = chunk[chunk['time'] > last_time]
+            if len(chunk) > 0:
+                chunks.append(chunk)
+                last_time = chunk['time'][-1]
+
+        if not chunks:
+            _log(f"❌ {tf_str} download error: {mt5.last_error()}")
             return None
-
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        df.rename(columns={
-            'time': 'datetime',
-            'open': 'open',
-            'high': 'high',
-            'low': 'low',
-            'close': 'close',
-            'tick_volume': 'volume'
-        }, inplace=True)
-
-        df = df[['datetime', 'open', 'high', 'low', 'close', 'volume']]
-
-        print(f"✅ {len(df)} candles downloaded ({df['datetime'].iloc[0]} - {df['datetime'].iloc[-1]})")
-        self._validate_data(df)
+        if failed_windows:
+            _log(f"⚠️ {tf_str}: {failed_windows}/{len(edges) - 1} monthly windows failed: {mt5.last_error()}")
+
+        # Edges are already deduplicated, so one concatenation is the only full-size copy
+        rates = np.concatenate(chunks)
+        del chunks
+
+        # Build the frame once from the structured array fields (no rename / reselect)
+        df = pd.DataFrame({
+            'datetime': pd.to_datetime(rates['time'], unit='s'),
+            'open': rates['open'],
+            'high': rates['high'],
+            'low': rates['low'],
+            'close': rates['close'],
+            'volume': rates['tick_volume']
+        }, copy=False)
+
+        _log(f"✅ {tf_str}: {len(df)} candles downloaded ({df['datetime'].iloc[0]} - {df['datetime'].iloc[-1]})")
+        self._validate_data(df, tf_str)
         return df
 
-    def _validate_data(self, df):
+    def _validate_data(self, df, label=""):
         """Validate downloaded data integrity"""
-        null_counts = df.isnull().sum()
-        duplicates = df['datetime'].duplicated().sum()
-        chronological = df['datetime'].is_monotonic_increasing
+        null_count = int(df.isna().to_numpy().sum())
+
+        # One pass over the timestamps: a zero step is a duplicate, a negative one is out of order
+        steps = np.diff(df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+        duplicates = int((steps == 0).sum())
+        chronological = bool((steps >= 0).all())
 
         issues = []
-        if null_counts.sum() > 0:
-            issues.append(f"{null_counts.sum()} null values")
+        if null_count > 0:
+            issues.append(f"{null_count} null values")
         if duplicates > 0:
             issues.append(f"{duplicates} duplicate timestamps")
         if not chronological:
             issues.append("data out of order")
 
         if issues:
-            print(f"⚠️ Warnings: {', '.join(issues)}")
+            _log(f"⚠️ {label + ' ' if label else ''}Warnings: {', '.join(issues)}")
 
     def save_to_csv(self, df, filepath):
         """Save DataFrame to CSV"""
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         df.to_csv(filepath, index=False)
-        print(f"💾 Data saved: {filepath} ({os.path.getsize(filepath) / 1024:.1f} KB)")
+        _log(f"💾 Data saved: {filepath} ({os.path.getsize(filepath) / 1024:.1f} KB)")
+
+    def save_to_parquet(self, df, filepath):
+        """Save DataFrame to Parquet (pyarrow, zstd)"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        df.to_parquet(filepath, engine='pyarrow', compression='zstd', index=False)
+        _log(f"💾 Data saved: {filepath} ({os.path.getsize(filepath) / 1024:.1f} KB)")
 
     def shutdown(self):
         """Close MT5 connection"""
         if self.connected:
-            mt5.shutdown()
             self.connected = False
-            print("🔌 Disconnected from MT5")
+            with MT5Connector._session_lock:
+                MT5Connector._session_refs -= 1
+                if MT5Connector._session_refs > 0:
+                    return
+                mt5.shutdown()
+            _log("🔌 Disconnected from MT5")
@@ -4,9 +4,376 @@ EMA20/EMA50 Crossover Strategy
 With DI H4 Filter + BE ATR Filter + TP ATR Filter
 """
 
+import sys
 import pandas as pd
 import numpy as np
 import config
+from core._njit import njit, prange, NUMBA_AVAILABLE
+
+# Direction codes used by the scan kernel
+LONG = 1
+SHORT = -1
+
+# Exit type codes used by the scan kernel
+EXIT_SL = 0
+EXIT_TP_ATR = 1
+EXIT_BE = 2
+EXIT_CROSS = 3
+EXIT_EOD = 4
+
+# Outcome codes stored in the setup records
+OUTCOME_LOSS = 0
+OUTCOME_WIN = 1
+OUTCOME_BE = 2
+
+# Debug window: set to a (start, end) pair, e.g. ('2025-10-29', '2025-10-30'),
+# to trace every candle of that range after the scan. None disables it.
+DEBUG_DATE_RANGE = None
+
+_DIR_STR = {LONG: 'LONG', SHORT: 'SHORT'}
+_EXIT_TYPE_STR = {EXIT_SL: 'SL', EXIT_TP_ATR: 'TP_ATR', EXIT_BE: 'BE', EXIT_CROSS: 'CROSS', EXIT_EOD: 'EOD'}
+
+_OUTCOME_NAMES = np.array(['LOSS', 'WIN', 'BE'])
+
+# Setup record layout (one row per detected setup). Direction, exit type and
+# outcome are int8 codes and prices/pips are kept unrounded; labels and
+# rounding are applied only when the DataFrame is built (_setups_frame)
+SETUP_DTYPE = np.dtype([
+    ('setup_id', 'i4'),
+    ('entry_date', 'datetime64[ns]'),
+    ('direction', 'i1'),
+    ('entry_price', 'f8'),
+    ('sl_price', 'f8'),
+    ('exit_date', 'datetime64[ns]'),
+    ('exit_price', 'f8'),
+    ('exit_type', 'i1'),
+    ('outcome', 'i1'),
+    ('pips', 'f8'),
+    ('candles_held', 'i4')
+])
+
+
+@njit(cache=True)
+def _simulate_trade_loop(entry_idx, direction, entry_price, sl_price, high, low, close, ema20, atr,
+                    cross_dir, use_tp_atr, tp_atr_multiplier, use_be_atr, be_atr_multiplier):
+    """
+    Simulate one trade forward from entry_idx
+
+    Exit conditions (priority order, TP/BE/cross only after the entry candle):
+    1. Stop loss hit
+    2. Take Profit ATR (EMA20 +/- multiplier * ATR, exit at target price)
+    3. Break Even by ATR retracement (deep retracement, then return to entry)
+    4. EMA20 crosses EMA50 back (cross_dir lookup, exit at close)
+
+    Returns:
+        (exit_idx, exit_type, exit_price); EXIT_EOD at the last candle if no exit
+    """
+    n = len(close)
+    d = direction
+    armed_at = n
+
+    # Phase 1: until a deep retracement arms the break even
+    for j in range(entry_idx, n):
+        # PRIORITY 1: Stop Loss
+        if d == LONG:
+            if low[j] <= sl_price:
+                return j, EXIT_SL, sl_price
+        else:
+            if high[j] >= sl_price:
+                return j, EXIT_SL, sl_price
+
+        if j == entry_idx:
+            continue
+
+        # PRIORITY 2: TP ATR (exit at target price, not high/low)
+        if use_tp_atr:
+            ema20_j = ema20[j]
+            atr_j = atr[j]
+            if not np.isnan(ema20_j) and not np.isnan(atr_j) and atr_j > 0:
+                if d == LONG:
+                    tp_target = ema20_j + tp_atr_multiplier * atr_j
+                    if high[j] >= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+                else:
+                    tp_target = ema20_j - tp_atr_multiplier * atr_j
+                    if low[j] <= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+
+        # PRIORITY 3: BE ATR (arm on deep retracement, resume in phase 2 on this candle)
+        if use_be_atr:
+            atr_j = atr[j]
+            if atr_j > 0 and not np.isnan(atr_j):
+                if d == LONG:
+                    retroceso = (entry_price - low[j]) / atr_j
+                else:
+                    retroceso = (high[j] - entry_price) / atr_j
+                if retroceso >= be_atr_multiplier:
+                    armed_at = j
+                    break
+
+        # PRIORITY 4: EMA cross reversal
+        if cross_dir[j] == -d:
+            return j, EXIT_CROSS, close[j]
+
+    # Phase 2: break even armed, only the return to entry is left to check for BE
+    for j in range(armed_at, n):
+        # PRIORITY 1: Stop Loss
+        if d == LONG:
+            if low[j] <= sl_price:
+                return j, EXIT_SL, sl_price
+        else:
+            if high[j] >= sl_price:
+                return j, EXIT_SL, sl_price
+
+        # PRIORITY 2: TP ATR
+        if use_tp_atr:
+            ema20_j = ema20[j]
+            atr_j = atr[j]
+            if not np.isnan(ema20_j) and not np.isnan(atr_j) and atr_j > 0:
+                if d == LONG:
+                    tp_target = ema20_j + tp_atr_multiplier * atr_j
+                    if high[j] >= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+                else:
+                    tp_target = ema20_j - tp_atr_multiplier * atr_j
+                    if low[j] <= tp_target:
+                        return j, EXIT_TP_ATR, tp_target
+
+        # PRIORITY 3: BE ATR (return to entry)
+        atr_j = atr[j]
+        if atr_j > 0 and not np.isnan(atr_j):
+            if d == LONG:
+                if high[j] >= entry_price:
+                    return j, EXIT_BE, entry_price
+            else:
+                if low[j] <= entry_price:
+                    return j, EXIT_BE, entry_price
+
+        # PRIORITY 4: EMA cross reversal
+        if cross_dir[j] == -d:
+            return j, EXIT_CROSS, close[j]
+
+    return n - 1, EXIT_EOD, close[n - 1]
+
+
+@njit(cache=True)
+def _trade_pips(direction, entry_price, exit_type, exit_price, pip_factor):
+    """Signed result of a closed trade in pips (break-even exits count as 0)"""
+    if exit_type == EXIT_BE:
+        return 0.0
+    return direction * (exit_price - entry_price) * pip_factor
+
+
+def _first_true(mask):
+    """Index of the first True in mask, or len(mask) if there is none"""
+    if mask.size == 0:
+        return 0
+    i = int(mask.argmax())
+    return i if mask[i] else len(mask)
+
+
+def _simulate_trade_numpy(entry_idx, direction, entry_price, sl_price, high, low, close, ema20, atr,
+                          cross_dir, use_tp_atr, tp_atr_multiplier, use_be_atr, be_atr_multiplier):
+    """
+    _simulate_trade without numba: every exit condition is a vectorised
+    first-hit scan and same-candle priority is resolved on the indices
+    """
+    n = len(close)
+    d = direction
+
+    # First SL hit (entry candle included) and first opposite cross (after entry)
+    sl_hit = low[entry_idx:] <= sl_price if d == LONG else high[entry_idx:] >= sl_price
+    sl_i = entry_idx + _first_true(sl_hit)
+    cx_i = entry_idx + 1 + _first_true(cross_dir[entry_idx + 1:] == -d)
+
+    # TP/BE can only win on candles before the SL hit, up to the cross candle
+    lo, hi = entry_idx + 1, min(sl_i, cx_i + 1, n)
+    tp_i = be_i = hi
+    if (use_tp_atr or use_be_atr) and hi > lo:
+        atr_w = atr[lo:hi]
+        atr_ok = (atr_w > 0) & ~np.isnan(atr_w)
+
+        if use_tp_atr:
+            ema_w = ema20[lo:hi]
+            tp_target = ema_w + d * tp_atr_multiplier * atr_w
+            tp_hit = high[lo:hi] >= tp_target if d == LONG else low[lo:hi] <= tp_target
+            tp_i = lo + _first_true(atr_ok & ~np.isnan(ema_w) & tp_hit)
+
+        if use_be_atr:
+            # Deep retracement arms BE (sticky); exit when price returns to entry
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if d == LONG:
+                    retrace = (entry_price - low[lo:hi]) / atr_w
+                    back = high[lo:hi] >= entry_price
+                else:
+                    retrace = (high[lo:hi] - entry_price) / atr_w
+                    back = low[lo:hi] <= entry_price
+            deep_i = _first_true(atr_ok & (retrace >= be_atr_multiplier))
+            be_i = lo + deep_i + _first_true((atr_ok & back)[deep_i:])
+
+    # Priority on the same candle: SL > TP > BE > cross (SL is never inside the TP/BE window)
+    if min(tp_i, be_i) < hi:
+        if tp_i <= be_i:
+            return tp_i, EXIT_TP_ATR, tp_target[tp_i - lo]
+        return be_i, EXIT_BE, entry_price
+    if sl_i < n and sl_i <= cx_i:
+        return sl_i, EXIT_SL, sl_price
+    if cx_i < n:
+        return cx_i, EXIT_CROSS, close[cx_i]
+    return n - 1, EXIT_EOD, close[n - 1]
+
+
+# Kernel selection: numba > compiled Cython extension (if built) > vectorised numpy
+if NUMBA_AVAILABLE:
+    _simulate_trade = _simulate_trade_loop
+else:
+    try:
+        from core._simulate_trade import simulate_trade as _simulate_trade
+    except ImportError:
+        _simulate_trade = _simulate_trade_numpy
+
+
+@njit(cache=True)
+def _scan_setups(ema20, high, low, close, atr, cross_dir, sep_ok, touch,
+                 di_ok_long, di_ok_short,
+                 pip_factor, sl_distance,
+                 use_di_filter,
+                 use_tp_atr, tp_atr_multiplier,
+                 use_be_atr, be_atr_multiplier):
+    """
+    Scan for setups and simulate every trade in a single pass
+
+    State machine:
+    1. EMA20/EMA50 cross sets the direction (never enter on the cross candle)
+    2. Separation >= min pips (sep_ok) activates entry search
+    3. First candle touching EMA20 (touch) enters at EMA20 (if DI H4 filter passes)
+    4. Trade exits by priority: SL, TP ATR, BE ATR, EMA cross reversal (_simulate_trade)
+       - SL / TP ATR / BE: reset, wait for a NEW cross
+       - Cross reversal: that cross is the new signal immediately
+
+    Returns:
+        (entry_idx, exit_idx, direction, exit_price, exit_type, pips, filtered_by_di)
+        as parallel arrays truncated to the number of setups found
+    """
+    n = len(ema20)
+
+    entry_idx = np.empty(n, dtype=np.int64)
+    exit_idx = np.empty(n, dtype=np.int64)
+    direction = np.empty(n, dtype=np.int8)
+    exit_price = np.empty(n, dtype=np.float64)
+    exit_type = np.empty(n, dtype=np.int8)
+    pips = np.empty(n, dtype=np.float64)
+    count = 0
+    filtered_by_di = 0
+
+    # State variables
+    last_dir = 0
+    separation_achieved = False
+    skip_until_idx = 0
+
+    for i in range(1, n):
+        # Skip if we're within an exited trade period
+        if i <= skip_until_idx:
+            continue
+
+        # New cross detected - reset and update (never enter on cross candle itself)
+        if cross_dir[i] != 0:
+            last_dir = cross_dir[i]
+            separation_achieved = False
+            continue
+
+        if last_dir == 0:
+            continue
+
+        if not separation_achieved:
+            separation_achieved = sep_ok[i]
+        if not separation_achieved:
+            continue
+
+        # Entry search: candle range must include EMA20
+        if not touch[i]:
+            continue
+
+        # DI H4 filter (precomputed pass masks, see SetupDetector._di_h4_masks)
+        if use_di_filter:
+            di_ok = di_ok_long[i] if last_dir == LONG else di_ok_short[i]
+            if not di_ok:
+                # Don't enter, but don't reset - keep looking for next touch
+                filtered_by_di += 1
+                continue
+
+        # ENTRY CONDITIONS MET - simulate forward from entry (d = +1 LONG / -1 SHORT)
+        d = last_dir
+        entry_price = ema20[i]
+        sl_price = entry_price - d * sl_distance
+
+        ex_i, ex_type, ex_price = _simulate_trade(
+            i, d, entry_price, sl_price, high, low, close, ema20, atr, cross_dir,
+            use_tp_atr, tp_atr_multiplier, use_be_atr, be_atr_multiplier
+        )
+
+        entry_idx[count] = i
+        exit_idx[count] = ex_i
+        direction[count] = d
+        exit_price[count] = ex_price
+        exit_type[count] = ex_type
+        pips[count] = _trade_pips(d, entry_price, ex_type, ex_price, pip_factor)
+        count += 1
+
+        # Handle exit based on type
+        skip_until_idx = ex_i
+        if ex_type == EXIT_CROSS:
+            # Cross reversal exit - use as NEW signal
+            last_dir = -d
+            separation_achieved = False
+        elif ex_type != EXIT_EOD:
+            # SL / BE / TP ATR exit - RESET everything
+            last_dir = 0
+            separation_achieved = False
+
+    return (entry_idx[:count], exit_idx[:count], direction[:count], exit_price[:count],
+            exit_type[:count], pips[:count], filtered_by_di)
+
+
+@njit(cache=True, parallel=True)
+def _scan_setups_grid(ema20, high, low, close, atr, cross_dir, sep_pips, touch,
+                      has_htf, di_spread, params,
+                      pip_factor, use_di_filter,
+                      use_tp_atr, tp_atr_multiplier, use_be_atr):
+    """
+    Run _scan_setups for every parameter row in parallel over shared arrays
+
+    params columns: min_separation_pips, stop_loss_pips, be_atr_multiplier, di_h4_min_diff
+
+    Returns:
+        (P, 6) array: setups, wins, losses, be, total_pips, filtered_by_di
+    """
+    stats = np.zeros((params.shape[0], 6))
+    for p in prange(params.shape[0]):
+        sep_ok = sep_pips >= params[p, 0]
+        di_ok_long = ~has_htf | (di_spread >= params[p, 3])
+        di_ok_short = ~has_htf | (-di_spread >= params[p, 3])
+
+        _, _, _, _, exit_type, pips, filtered = _scan_setups(
+            ema20, high, low, close, atr, cross_dir, sep_ok, touch,
+            di_ok_long, di_ok_short,
+            pip_factor, params[p, 1] / pip_factor,
+            use_di_filter,
+            use_tp_atr, tp_atr_multiplier,
+            use_be_atr, params[p, 2]
+        )
+
+        # Same outcome rules as the stored setups (decided on unrounded pips), 1-decimal pips in the total
+        be = exit_type == EXIT_BE
+        win = (exit_type == EXIT_TP_ATR) | ((exit_type != EXIT_SL) & ~be & (pips > 0))
+        pips = np.round(pips, 1)
+        stats[p, 0] = len(exit_type)
+        stats[p, 1] = win.sum()
+        stats[p, 2] = len(exit_type) - win.sum() - be.sum()
+        stats[p, 3] = be.sum()
+        stats[p, 4] = pips.sum()
+        stats[p, 5] = filtered
+    return stats
 
 
 class SetupDetector:
@@ -33,7 +400,11 @@ class SetupDetector:
         self.symbol = symbol.upper()
         self.min_separation_pips = min_separation_pips
         self.stop_loss_pips = stop_loss_pips
-        self.setups = []
+
+        # Detected setups (SETUP_DTYPE records, grown by doubling)
+        self._setups_buf = np.empty(1024, dtype=SETUP_DTYPE)
+        self._n_setups = 0
+        self._setups_df = None  # DataFrame view of the buffer, built on first use
 
         # Filter settings
         self.use_di_h4_filter = use_di_h4_filter
@@ -52,6 +423,13 @@ class SetupDetector:
         self.pip_factor = config.get_pip_factor(symbol)
         self.symbol_info = config.get_symbol_info(symbol)
 
+        # Derived constants used on every scan
+        self._sl_distance = self.stop_loss_pips / self.pip_factor
+        self._decimals = self.symbol_info['decimals']
+        # Labels indexed by exit type code
+        self._exit_reasons = np.array(['Stop Loss', f'TP ATR {self.tp_atr_multiplier}', 'Break Even ATR',
+                                       'EMA Cross Reversal', 'End of Data'])
+
         print(f"\n📊 AUTO CONFIGURATION FOR {self.symbol}:")
         print(f"   📍 Type: {self.symbol_info['description']}")
         print(f"   🔢 Decimals: {self.symbol_info['decimals']}")
@@ -63,296 +441,58 @@ class SetupDetector:
         print(f"   BE ATR: {'ON' if self.use_be_atr else 'OFF'} (multiplier: {self.be_atr_multiplier})")
         print(f"   TP ATR: {'ON' if self.use_tp_atr else 'OFF'} (multiplier: {self.tp_atr_multiplier})")
 
-    def detect_ema_cross(self, df, idx):
+    @property
+    def setups(self):
+        """Detected setups as a list of dicts"""
+        return self._setups_frame().to_dict('records')
+
+    def _setups_frame(self):
+        """Detected setups as a DataFrame (codes decoded to labels, prices/pips rounded; cached, do not mutate)"""
+        if self._setups_df is not None:
+            return self._setups_df
+
+        rows = self._setups_buf[:self._n_setups]
+        self._setups_df = pd.DataFrame({
+            'setup_id': rows['setup_id'],
+            'entry_date': rows['entry_date'],
+            'direction': np.where(rows['direction'] == LONG, _DIR_STR[LONG], _DIR_STR[SHORT]),
+            'entry_price': np.round(rows['entry_price'], self._decimals),
+            'sl_price': np.round(rows['sl_price'], self._decimals),
+            'exit_date': rows['exit_date'],
+            'exit_price': np.round(rows['exit_price'], self._decimals),
+            'exit_reason': self._exit_reasons[rows['exit_type']],
+            'outcome': _OUTCOME_NAMES[rows['outcome']],
+            'pips': np.round(rows['pips'], 1),
+            'candles_held': rows['candles_held']
+        })
+        return self._setups_df
+
+    @staticmethod
+    def compute_cross_direction(ema20, ema50):
         """
-        Detect EMA20/EMA50 crossover at given index
+        Precompute EMA20/EMA50 crossovers for every candle
 
         Returns:
-            'LONG' if EMA20 crosses above EMA50
-            'SHORT' if EMA20 crosses below EMA50
-            None if no cross
+            int8 array: +1 where EMA20 crosses above EMA50, -1 where it
+            crosses below, 0 otherwise (always 0 on the first candle)
         """
-        if idx == 0:
-            return None
-
-        prev_candle = df.iloc[idx - 1]
-        curr_candle = df.iloc[idx]
-
+        # One spread array; its sign flips where the EMAs cross
+        spread = ema20 - ema50
+        prev, curr = spread[:-1], spread[1:]
         # Bullish cross: EMA20 was below, now above EMA50
-        if prev_candle['ema20'] <= prev_candle['ema50'] and curr_candle['ema20'] > curr_candle['ema50']:
-            return 'LONG'
-
+        bull = (prev <= 0) & (curr > 0)
         # Bearish cross: EMA20 was above, now below EMA50
-        if prev_candle['ema20'] >= prev_candle['ema50'] and curr_candle['ema20'] < curr_candle['ema50']:
-            return 'SHORT'
-
-        return None
-
-    def check_separation(self, candle):
-        """
-        Check if EMAs have minimum separation in pips
-
-        Returns:
-            True if separation >= min_separation_pips
-        """
-        ema_diff = abs(candle['ema20'] - candle['ema50'])
-        ema_diff_pips = ema_diff * self.pip_factor
-
-        is_separated = ema_diff_pips >= self.min_separation_pips
-        return is_separated
-
-    def check_ema_touch(self, candle):
-        """
-        Check if price touches EMA20
-
-        Returns:
-            True if candle's range includes EMA20
-        """
-        touches = candle['low'] <= candle['ema20'] <= candle['high']
-        return touches
-
-    def check_di_h4_filter(self, df_htf, entry_datetime, direction):
-        """
-        Check if H4 DI alignment confirms trade direction
-
-        Args:
-            df_htf: H4 DataFrame with indicators
-            entry_datetime: Entry time in H1
-            direction: 'LONG' or 'SHORT'
-
-        Returns:
-            True if H4 DI confirms direction, False otherwise
-        """
-        if df_htf is None or not self.use_di_h4_filter:
-            return True
-
-        # Find the H4 candle that contains this H1 entry time
-        entry_dt = pd.to_datetime(entry_datetime)
-
-        # Get H4 candles that are <= entry time (most recent completed H4)
-        mask = df_htf['datetime'] <= entry_dt
-        if not mask.any():
-            return True  # No H4 data available, allow trade
-
-        # Get the most recent H4 candle
-        h4_candle = df_htf[mask].iloc[-1]
-
-        # Calculate DI difference
-        plus_di = h4_candle['plus_di']
-        minus_di = h4_candle['minus_di']
-
-        if direction == 'LONG':
-            # For LONG: +DI should be stronger than -DI
-            di_diff = plus_di - minus_di
-            passes = di_diff >= self.di_h4_min_diff
-        else:  # SHORT
-            # For SHORT: -DI should be stronger than +DI
-            di_diff = minus_di - plus_di
-            passes = di_diff >= self.di_h4_min_diff
+        bear = (prev >= 0) & (curr < 0)
 
-        return passes
-
-    def simulate_trade(self, df, entry_idx, direction, entry_price):
-        """
-        Simulate trade outcome from entry forward
-
-        Exit conditions (priority order):
-        1. Stop loss hit (20 pips fixed)
-        2. Take Profit ATR (dynamic)
-        3. Break Even by ATR retracement
-        4. EMA20 crosses EMA50 back (trend reversal)
-
-        Returns:
-            dict with trade outcome details including exit_idx and exit_type
-        """
-        # Calculate stop loss price
-        sl_distance = self.stop_loss_pips / self.pip_factor
-
-        if direction == 'LONG':
-            sl_price = entry_price - sl_distance
-        else:  # SHORT
-            sl_price = entry_price + sl_distance
-
-        # BE ATR state
-        retroceso_profundo = False
-
-        # Simulate forward from entry
-        for i in range(entry_idx, len(df)):
-            candle = df.iloc[i]
-
-            # PRIORITY 1: Check Stop Loss FIRST
-            if direction == 'LONG':
-                if candle['low'] <= sl_price:
-                    pips = (sl_price - entry_price) * self.pip_factor
-                    return {
-                        'outcome': 'LOSS',
-                        'exit_date': candle['datetime'],
-                        'exit_price': sl_price,
-                        'exit_idx': i,
-                        'exit_type': 'SL',
-                        'pips': round(pips, 1),
-                        'candles_held': i - entry_idx,
-                        'exit_reason': 'Stop Loss'
-                    }
-            else:  # SHORT
-                if candle['high'] >= sl_price:
-                    pips = (entry_price - sl_price) * self.pip_factor
-                    return {
-                        'outcome': 'LOSS',
-                        'exit_date': candle['datetime'],
-                        'exit_price': sl_price,
-                        'exit_idx': i,
-                        'exit_type': 'SL',
-                        'pips': round(pips, 1),
-                        'candles_held': i - entry_idx,
-                        'exit_reason': 'Stop Loss'
-                    }
-
-            # PRIORITY 2: Check TP ATR (after entry candle)
-            if self.use_tp_atr and i > entry_idx:
-                ema20_current = candle['ema20']
-                atr_current = candle['atr']
-
-                if not np.isnan(ema20_current) and not np.isnan(atr_current) and atr_current > 0:
-                    if direction == 'LONG':
-                        tp_target = ema20_current + (self.tp_atr_multiplier * atr_current)
-                        if candle['high'] >= tp_target:
-                            # Exit at TP target price (NOT high)
-                            pips = (tp_target - entry_price) * self.pip_factor
-                            self.tp_atr_activated += 1
-                            return {
-                                'outcome': 'WIN',
-                                'exit_date': candle['datetime'],
-                                'exit_price': tp_target,
-                                'exit_idx': i,
-                                'exit_type': 'TP_ATR',
-                                'pips': round(pips, 1),
-                                'candles_held': i - entry_idx,
-                                'exit_reason': f'TP ATR {self.tp_atr_multiplier}'
-                            }
-                    else:  # SHORT
-                        tp_target = ema20_current - (self.tp_atr_multiplier * atr_current)
-                        if candle['low'] <= tp_target:
-                            # Exit at TP target price (NOT low)
-                            pips = (entry_price - tp_target) * self.pip_factor
-                            self.tp_atr_activated += 1
-                            return {
-                                'outcome': 'WIN',
-                                'exit_date': candle['datetime'],
-                                'exit_price': tp_target,
-                                'exit_idx': i,
-                                'exit_type': 'TP_ATR',
-                                'pips': round(pips, 1),
-                                'candles_held': i - entry_idx,
-                                'exit_reason': f'TP ATR {self.tp_atr_multiplier}'
-                            }
-
-            # PRIORITY 3: Check BE ATR (after entry candle)
-            if self.use_be_atr and i > entry_idx:
-                atr_val = candle['atr']
-
-                if atr_val > 0 and not np.isnan(atr_val):
-                    # Check for deep retracement
-                    if direction == 'LONG':
-                        retroceso = (entry_price - candle['low']) / atr_val
-                        if retroceso >= self.be_atr_multiplier:
-                            retroceso_profundo = True
-                    else:  # SHORT
-                        retroceso = (candle['high'] - entry_price) / atr_val
-                        if retroceso >= self.be_atr_multiplier:
-                            retroceso_profundo = True
-
-                    # If deep retracement detected, check for return to entry
-                    if retroceso_profundo:
-                        if direction == 'LONG' and candle['high'] >= entry_price:
-                            self.be_activated += 1
-                            return {
-                                'outcome': 'BE',
-                                'exit_date': candle['datetime'],
-                                'exit_price': entry_price,
-                                'exit_idx': i,
-                                'exit_type': 'BE',
-                                'pips': 0.0,
-                                'candles_held': i - entry_idx,
-                                'exit_reason': 'Break Even ATR'
-                            }
-                        if direction == 'SHORT' and candle['low'] <= entry_price:
-                            self.be_activated += 1
-                            return {
-                                'outcome': 'BE',
-                                'exit_date': candle['datetime'],
-                                'exit_price': entry_price,
-                                'exit_idx': i,
-                                'exit_type': 'BE',
-                                'pips': 0.0,
-                                'candles_held': i - entry_idx,
-                                'exit_reason': 'Break Even ATR'
-                            }
-
-            # PRIORITY 4: Check EMA cross reversal (exit condition)
-            if i > entry_idx:  # Don't check on entry candle
-                cross_direction = self.detect_ema_cross(df, i)
-
-                # Exit if cross in opposite direction
-                if direction == 'LONG' and cross_direction == 'SHORT':
-                    exit_price = candle['close']
-                    pips = (exit_price - entry_price) * self.pip_factor
-                    outcome = 'WIN' if pips > 0 else 'LOSS'
-                    return {
-                        'outcome': outcome,
-                        'exit_date': candle['datetime'],
-                        'exit_price': exit_price,
-                        'exit_idx': i,
-                        'exit_type': 'CROSS',
-                        'exit_cross_direction': 'SHORT',
-                        'pips': round(pips, 1),
-                        'candles_held': i - entry_idx,
-                        'exit_reason': 'EMA Cross Reversal'
-                    }
-
-                if direction == 'SHORT' and cross_direction == 'LONG':
-                    exit_price = candle['close']
-                    pips = (entry_price - exit_price) * self.pip_factor
-                    outcome = 'WIN' if pips > 0 else 'LOSS'
-                    return {
-                        'outcome': outcome,
-                        'exit_date': candle['datetime'],
-                        'exit_price': exit_price,
-                        'exit_idx': i,
-                        'exit_type': 'CROSS',
-                        'exit_cross_direction': 'LONG',
-                        'pips': round(pips, 1),
-                        'candles_held': i - entry_idx,
-                        'exit_reason': 'EMA Cross Reversal'
-                    }
-
-        # If we reach end of data without exit
-        last_candle = df.iloc[-1]
-        exit_price = last_candle['close']
-
-        if direction == 'LONG':
-            pips = (exit_price - entry_price) * self.pip_factor
-        else:
-            pips = (entry_price - exit_price) * self.pip_factor
-
-        outcome = 'WIN' if pips > 0 else 'LOSS'
-
-        return {
-            'outcome': outcome,
-            'exit_date': last_candle['datetime'],
-            'exit_price': exit_price,
-            'exit_idx': len(df) - 1,
-            'exit_type': 'EOD',
-            'pips': round(pips, 1),
-            'candles_held': len(df) - entry_idx,
-            'exit_reason': 'End of Data'
-        }
+        cross_dir = np.zeros(len(ema20), dtype=np.int8)
+        cross_dir[1:] = bull.view(np.int8) - bear.view(np.int8)
+        return cross_dir
 
     def detect_all_setups(self, df, df_htf=None, start_date=None, end_date=None):
         """
         Detect all trading setups in the given period
 
-        LOGIC:
+        LOGIC (see _scan_setups):
         1. Detect EMA20/EMA50 cross (updates with each new cross)
         2. Wait for separation >= 3 pips (activates entry search)
         3. First candle that touches EMA20 → ENTER (if passes filters)
@@ -362,89 +502,45 @@ class SetupDetector:
         """
         print(f"\n🔍 Scanning for setups from {start_date.date()} to {end_date.date()}...")
 
-        # Filter analysis period
-        mask = (df['datetime'] >= start_date) & (df['datetime'] <= end_date)
-        analysis_df = df[mask].copy().reset_index(drop=True)
-
-        if len(analysis_df) == 0:
+        arrays = self._analysis_arrays(df, start_date, end_date)
+        if arrays is None:
             print("❌ No data in analysis period")
             return []
+        dt, ema20, ema50, high, low, close, atr = arrays
 
-        print(f"📊 Analyzing {len(analysis_df)} candles...")
+        print(f"📊 Analyzing {len(dt)} candles...")
 
-        # State variables
-        last_cross_direction = None
-        separation_achieved = False
-        skip_until_idx = 0
+        cross_dir = self.compute_cross_direction(ema20, ema50)
+        sep_ok = np.abs(ema20 - ema50) * self.pip_factor >= self.min_separation_pips
+        touch = (low <= ema20) & (ema20 <= high)
 
-        for i in range(1, len(analysis_df)):
-            candle = analysis_df.iloc[i]
+        use_di_filter = self.use_di_h4_filter and df_htf is not None
+        if use_di_filter:
+            di_ok_long, di_ok_short = self._di_h4_masks(dt, df_htf)
+        else:
+            di_ok_long = di_ok_short = np.empty(0, dtype=np.bool_)
 
-            # Skip if we're within an exited trade period
-            if i <= skip_until_idx:
-                continue
+        entry_idx, exit_idx, direction, exit_price, exit_type, pips, filtered = _scan_setups(
+            ema20, high, low, close, atr, cross_dir, sep_ok, touch,
+            di_ok_long, di_ok_short,
+            float(self.pip_factor), float(self._sl_distance),
+            use_di_filter,
+            self.use_tp_atr, float(self.tp_atr_multiplier),
+            self.use_be_atr, float(self.be_atr_multiplier)
+        )
 
-            # Check for new EMA cross
-            cross = self.detect_ema_cross(analysis_df, i)
+        if DEBUG_DATE_RANGE is not None:
+            dbg_lo, dbg_hi = np.searchsorted(dt, np.array(DEBUG_DATE_RANGE, dtype='datetime64[ns]'))
+            self._print_debug_window(dbg_lo, dbg_hi, dt, ema20, ema50, touch, cross_dir,
+                                     entry_idx, exit_idx, exit_type)
 
-            if cross:
-                # New cross detected - reset and update
-                last_cross_direction = cross
-                separation_achieved = False
-                # Continue to next candle (never enter on cross candle itself)
-                continue
+        self.filtered_by_di_h4 += int(filtered)
+        self.tp_atr_activated += int(np.count_nonzero(exit_type == EXIT_TP_ATR))
+        self.be_activated += int(np.count_nonzero(exit_type == EXIT_BE))
 
-            # If we have a cross direction, check for entry conditions
-            if last_cross_direction:
-                # Check if separation achieved
-                if not separation_achieved:
-                    if self.check_separation(candle):
-                        separation_achieved = True
-
-                # If separation achieved, look for entry
-                if separation_achieved:
-                    touches_ema = self.check_ema_touch(candle)
-
-                    if touches_ema:
-                        # Check DI H4 filter before entry
-                        if not self.check_di_h4_filter(df_htf, candle['datetime'], last_cross_direction):
-                            self.filtered_by_di_h4 += 1
-                            # Don't enter, but don't reset - keep looking for next touch
-                            continue
-
-                        # ENTRY CONDITIONS MET (passed all filters)
-                        trade_result = self._process_entry(analysis_df, i, last_cross_direction, candle)
-
-                        # Handle exit based on type
-                        if trade_result['exit_type'] == 'SL':
-                            # Stop Loss exit - RESET everything
-                            skip_until_idx = trade_result['exit_idx']
-                            last_cross_direction = None
-                            separation_achieved = False
-
-                        elif trade_result['exit_type'] == 'BE':
-                            # Break Even exit - RESET everything
-                            skip_until_idx = trade_result['exit_idx']
-                            last_cross_direction = None
-                            separation_achieved = False
-
-                        elif trade_result['exit_type'] == 'TP_ATR':
-                            # TP ATR exit - RESET everything
-                            skip_until_idx = trade_result['exit_idx']
-                            last_cross_direction = None
-                            separation_achieved = False
-
-                        elif trade_result['exit_type'] == 'CROSS':
-                            # Cross reversal exit - Use as NEW signal
-                            skip_until_idx = trade_result['exit_idx']
-                            last_cross_direction = trade_result['exit_cross_direction']
-                            separation_achieved = False
-
-                        else:  # EOD
-                            # End of data - just stop
-                            skip_until_idx = trade_result['exit_idx']
-
-        print(f"\n✅ Setup detection completed: {len(self.setups)} setups found")
+        self._store_setups(dt, ema20, entry_idx, exit_idx, direction, exit_price, exit_type, pips)
+
+        print(f"\n✅ Setup detection completed: {self._n_setups} setups found")
         if self.use_di_h4_filter:
             print(f"🔧 Filtered by DI H4: {self.filtered_by_di_h4} potential entries rejected")
         if self.use_be_atr:
@@ -454,72 +550,195 @@ class SetupDetector:
 
         return self.setups
 
-    def _process_entry(self, df, entry_idx, direction, candle):
+    def detect_all_setups_grid(self, df, params, df_htf=None, start_date=None, end_date=None):
+        """
+        Sweep parameter combinations over the same period in one parallel pass
+
+        Args:
+            params: (P, 4) array-like of rows
+                (min_separation_pips, stop_loss_pips, be_atr_multiplier, di_h4_min_diff);
+                the remaining filters and symbol settings come from this detector
+
+        Returns:
+            DataFrame with one row per combination (params + performance);
+            detected setups and counters of this detector are not modified
         """
-        Process trade entry and simulate outcome
+        params = np.ascontiguousarray(params, dtype=np.float64).reshape(-1, 4)
+        print(f"\n🔍 Sweeping {len(params)} parameter sets from {start_date.date()} to {end_date.date()}...")
+
+        arrays = self._analysis_arrays(df, start_date, end_date)
+        if arrays is None:
+            print("❌ No data in analysis period")
+            return None
+        dt, ema20, ema50, high, low, close, atr = arrays
+
+        cross_dir = self.compute_cross_direction(ema20, ema50)
+        sep_pips = np.abs(ema20 - ema50) * self.pip_factor
+        touch = (low <= ema20) & (ema20 <= high)
+
+        use_di_filter = self.use_di_h4_filter and df_htf is not None
+        if use_di_filter:
+            has_htf, di_spread = self._di_h4_spread(dt, df_htf)
+        else:
+            has_htf = np.empty(0, dtype=np.bool_)
+            di_spread = np.empty(0, dtype=np.float64)
+
+        stats = _scan_setups_grid(
+            ema20, high, low, close, atr, cross_dir, sep_pips, touch,
+            has_htf, di_spread, params,
+            float(self.pip_factor), use_di_filter,
+            self.use_tp_atr, float(self.tp_atr_multiplier), self.use_be_atr
+        )
+
+        results = pd.DataFrame(params, columns=['min_separation_pips', 'stop_loss_pips',
+                                                'be_atr_multiplier', 'di_h4_min_diff'])
+        for k, col in enumerate(['setups', 'wins', 'losses', 'be', 'total_pips', 'filtered_by_di_h4']):
+            results[col] = stats[:, k]
+        counts = ['setups', 'wins', 'losses', 'be', 'filtered_by_di_h4']
+        results[counts] = results[counts].astype(np.int64)
+        results['win_rate'] = np.divide(stats[:, 1] * 100, stats[:, 0],
+                                        out=np.zeros(len(stats)), where=stats[:, 0] > 0)
+
+        print(f"✅ Sweep completed: {len(params)} parameter sets")
+        return results
+
+    def _analysis_arrays(self, df, start_date, end_date):
+        """Scan inputs for the analysis period as array views (None if the period is empty)"""
+        # datetime is sorted: bound the period with two binary searches instead of a mask + copy
+        dt_all = df['datetime'].to_numpy(dtype='datetime64[ns]')
+        start_i = np.searchsorted(dt_all, np.datetime64(start_date, 'ns'), side='left')
+        end_i = np.searchsorted(dt_all, np.datetime64(end_date, 'ns'), side='right')
+        if end_i <= start_i:
+            return None
+
+        # high/low only feed comparisons, so float32 columns are scanned as-is by the
+        # dtype-generic numba kernels (no upcast copy); the rest set prices and stay float64
+        def scan_array(col, keep_float32=False):
+            keep = keep_float32 and NUMBA_AVAILABLE and df[col].dtype == np.float32
+            return df[col].to_numpy(dtype=np.float32 if keep else np.float64)[start_i:end_i]
+
+        return (dt_all[start_i:end_i], scan_array('ema20'), scan_array('ema50'),
+                scan_array('high', True), scan_array('low', True),
+                scan_array('close'), scan_array('atr'))
+
+    def _di_h4_spread(self, dt, df_htf):
+        """
+        +DI - -DI of the most recent H4 candle with open time <= each H1 candle
 
         Returns:
-            trade_result dict with exit info
+            (has_htf, di_spread): has_htf is False before the first H4 candle
         """
-        entry_price = candle['ema20']
-
-        # Simulate trade
-        trade_result = self.simulate_trade(df, entry_idx, direction, entry_price)
-
-        # Store setup
-        setup = {
-            'setup_id': len(self.setups) + 1,
-            'entry_date': candle['datetime'],
-            'direction': direction,
-            'entry_price': round(entry_price, self.symbol_info['decimals']),
-            'sl_price': round(entry_price - (self.stop_loss_pips / self.pip_factor) if direction == 'LONG'
-                              else entry_price + (self.stop_loss_pips / self.pip_factor),
-                              self.symbol_info['decimals']),
-            'exit_date': trade_result['exit_date'],
-            'exit_price': round(trade_result['exit_price'], self.symbol_info['decimals']),
-            'exit_reason': trade_result['exit_reason'],
-            'outcome': trade_result['outcome'],
-            'pips': trade_result['pips'],
-            'candles_held': trade_result['candles_held']
-        }
-
-        self.setups.append(setup)
-        return trade_result
+        htf_ns = df_htf['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if len(htf_ns) == 0:
+            return np.zeros(len(dt), dtype=np.bool_), np.full(len(dt), np.nan)
+        htf_idx = np.searchsorted(htf_ns, dt.view(np.int64), side='right') - 1
+        has_htf = htf_idx >= 0
+
+        plus_di = df_htf['plus_di'].to_numpy(dtype=np.float64)
+        minus_di = df_htf['minus_di'].to_numpy(dtype=np.float64)
+        di_spread = np.where(has_htf, plus_di[htf_idx.clip(0)] - minus_di[htf_idx.clip(0)], np.nan)
+        return has_htf, di_spread
+
+    def _di_h4_masks(self, dt, df_htf):
+        """
+        DI H4 filter outcome for a LONG / SHORT entry on every H1 candle
+
+        H1 candles before the first H4 candle pass, NaN DI values fail.
+        """
+        has_htf, di_spread = self._di_h4_spread(dt, df_htf)
+        di_ok_long = ~has_htf | (di_spread >= self.di_h4_min_diff)
+        di_ok_short = ~has_htf | (-di_spread >= self.di_h4_min_diff)
+        return di_ok_long, di_ok_short
+
+    def _print_debug_window(self, dbg_lo, dbg_hi, dt, ema20, ema50, touch, cross_dir,
+                            entry_idx, exit_idx, exit_type):
+        """Trace candles in [dbg_lo, dbg_hi) from the scan inputs and results"""
+        entries = {int(e): k for k, e in enumerate(entry_idx)}
+        exits = {int(x): k for k, x in enumerate(exit_idx)}
+
+        # Lines are buffered and written in one call; the window can span thousands of candles
+        lines = [f"\n🐞 DEBUG {DEBUG_DATE_RANGE[0]} - {DEBUG_DATE_RANGE[1]} ({dbg_hi - dbg_lo} candles)"]
+        # Format all window timestamps in one call (MT5 times are whole seconds)
+        stamps = np.char.replace(np.datetime_as_string(dt[dbg_lo:dbg_hi], unit='s'), 'T', ' ')
+        for i in range(dbg_lo, dbg_hi):
+            sep_pips = abs(ema20[i] - ema50[i]) * self.pip_factor
+            line = (f"   {stamps[i - dbg_lo]} | EMA20 {ema20[i]:.5f} EMA50 {ema50[i]:.5f} | "
+                    f"sep {sep_pips:.1f} pips | touch {'Y' if touch[i] else 'N'}")
+            if cross_dir[i]:
+                line += f" | CROSS {_DIR_STR[int(cross_dir[i])]}"
+            if i in entries:
+                line += f" | ENTRY #{entries[i] + 1}"
+            if i in exits:
+                line += f" | EXIT #{exits[i] + 1} ({_EXIT_TYPE_STR[int(exit_type[exits[i]])]})"
+            lines.append(line)
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    def _store_setups(self, dt, ema20, entry_idx, exit_idx, direction, exit_price, exit_type, pips):
+        """Append the scan results as setup records (filled column by column)"""
+        count = len(entry_idx)
+        start, end = self._n_setups, self._n_setups + count
+        if end > len(self._setups_buf):
+            grown = np.empty(max(end, 2 * len(self._setups_buf)), dtype=SETUP_DTYPE)
+            grown[:start] = self._setups_buf[:start]
+            self._setups_buf = grown
+
+        entry_price = ema20[entry_idx]
+        sl_price = entry_price - direction * self._sl_distance
+
+        outcome = np.where(pips > 0, OUTCOME_WIN, OUTCOME_LOSS)
+        outcome[exit_type == EXIT_SL] = OUTCOME_LOSS
+        outcome[exit_type == EXIT_TP_ATR] = OUTCOME_WIN
+        outcome[exit_type == EXIT_BE] = OUTCOME_BE
+
+        rows = self._setups_buf[start:end]
+        rows['setup_id'] = np.arange(start + 1, end + 1)
+        rows['entry_date'] = dt[entry_idx]
+        rows['direction'] = direction
+        rows['entry_price'] = entry_price
+        rows['sl_price'] = sl_price
+        rows['exit_date'] = dt[exit_idx]
+        rows['exit_price'] = exit_price
+        rows['exit_type'] = exit_type
+        rows['outcome'] = outcome
+        rows['pips'] = pips
+        # EOD counts the candles up to the end of the data
+        rows['candles_held'] = np.where(exit_type == EXIT_EOD, len(dt), exit_idx) - entry_idx
+        self._n_setups = end
+        self._setups_df = None
 
     def print_setups(self):
         """Print all detected setups"""
-        if not self.setups:
+        if self._n_setups == 0:
             print("\n❌ No setups found")
             return
 
-        print("\n" + "=" * 100)
-        print(f"DETECTED SETUPS: {len(self.setups)} total")
-        print("=" * 100)
-
+        # Build the whole listing and write it once (one print per line dominates on large runs)
+        lines = ["\n" + "=" * 100, f"DETECTED SETUPS: {self._n_setups} total", "=" * 100]
         for setup in self.setups:
-            print(f"\n📍 Setup #{setup['setup_id']} - {setup['direction']}")
-            print(f"   Entry: {setup['entry_date']} @ {setup['entry_price']}")
-            print(f"   Exit:  {setup['exit_date']} @ {setup['exit_price']}")
-            print(f"   Result: {setup['outcome']} | {setup['pips']:+.1f} pips | {setup['candles_held']} candles")
-            print(f"   Exit reason: {setup['exit_reason']}")
+            lines.append(f"\n📍 Setup #{setup['setup_id']} - {setup['direction']}")
+            lines.append(f"   Entry: {setup['entry_date']} @ {setup['entry_price']}")
+            lines.append(f"   Exit:  {setup['exit_date']} @ {setup['exit_price']}")
+            lines.append(f"   Result: {setup['outcome']} | {setup['pips']:+.1f} pips | {setup['candles_held']} candles")
+            lines.append(f"   Exit reason: {setup['exit_reason']}")
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def export_to_csv(self, filepath):
         """Export setups to CSV"""
-        if not self.setups:
+        if self._n_setups == 0:
             print("❌ No setups to export")
             return
 
-        df = pd.DataFrame(self.setups)
-        df.to_csv(filepath, index=False)
+        df = self._setups_frame()
+        df.to_csv(filepath, index=False, chunksize=10000)
         print(f"\n💾 Results exported: {filepath}")
 
     def get_executive_summary(self, symbol, start_date, end_date):
         """Display executive summary of results"""
-        if not self.setups:
+        if self._n_setups == 0:
             print("\n❌ No setups to summarize")
             return
 
-        df = pd.DataFrame(self.setups)
+        df = self._setups_frame()
 
         total_setups = len(df)
         wins = len(df[df['outcome'] == 'WIN'])
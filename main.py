@@ -3,26 +3,144 @@ ARMS v1.0 - Adaptive Regime Market Strategy
 Main Pipeline: Download → Indicators → Detection
 """
 
-import MetaTrader5 as mt5
-import pandas as pd
+import argparse
+import hashlib
+import multiprocessing as mp
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import os
+import sys
 from datetime import datetime
-from core.mt5_connector import MT5Connector
-from core.indicators import IndicatorCalculator
-from core.setup_detector import SetupDetector
 import config
 
+# pandas and the core modules are imported where first needed, so --help and plain imports stay fast
+
+_BANNER = "=" * 70
+
+
+def emit(*lines):
+    """Print lines with a single write (output of concurrent H1/H4 threads never shares a line)"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+# Column types of the raw CSV files (skips type inference on reload)
+RAW_CSV_DTYPES = {'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64', 'volume': 'int64'}
+
+
+@dataclass(frozen=True, slots=True)
+class RunConfig:
+    """Settings of one pipeline run, read from config once (field = lowercase config name)"""
+    # Data and analysis period
+    data_start_date: datetime
+    data_end_date: datetime
+    analysis_start_date: datetime
+    analysis_end_date: datetime
+    raw_data_max_age_hours: float
+    price_dtype: str
+    # Indicators
+    ema_period: int
+    ema_period_mid: int
+    ema_period_long: int
+    atr_period: int
+    adx_period: int
+    rsi_period: int
+    macd_fast: int
+    macd_slow: int
+    macd_signal: int
+    volume_sma_period: int
+    atr_adjustment_factor: float
+    # Strategy and filters
+    ema_cross_min_separation: float
+    stop_loss_pips: float
+    use_di_h4_filter: bool
+    di_h4_min_diff: float
+    use_be_atr: bool
+    be_atr_multiplier: float
+    use_tp_atr: bool
+    tp_atr_multiplier: float
+
+    @classmethod
+    def from_config(cls, **overrides):
+        """Snapshot of the config module, with keyword overrides"""
+        values = {name: getattr(config, name.upper()) for name in cls.__dataclass_fields__}
+        return cls(**{**values, **overrides})
+
+    def indicator_key(self):
+        """Settings (and indicator backend) the processed data depends on"""
+        from core.indicators import talib, NUMBA_AVAILABLE
+
+        return (self.ema_period, self.ema_period_mid, self.ema_period_long, self.atr_period,
+                self.adx_period, self.rsi_period, self.macd_fast, self.macd_slow,
+                self.macd_signal, self.volume_sma_period, self.atr_adjustment_factor,
+                self.price_dtype, talib is not None, NUMBA_AVAILABLE)
+
+
+def save_dataframe(df, filepath):
+    """Save DataFrame as Parquet or CSV (by file extension)"""
+    if filepath.endswith('.parquet'):
+        df.to_parquet(filepath, engine='pyarrow', compression='zstd', index=False)
+    else:
+        df.to_csv(filepath, index=False)
+
+
+def load_dataframe(filepath):
+    """Load a DataFrame written by save_dataframe"""
+    import pandas as pd
+
+    if filepath.endswith('.parquet'):
+        return pd.read_parquet(filepath, engine='pyarrow')
+    return pd.read_csv(filepath, parse_dates=['datetime'])
+
+
+def to_price_dtype(df, price_dtype):
+    """Cast the OHLC columns to price_dtype (raw files on disk keep full precision)"""
+    return df.astype({col: price_dtype for col in ('open', 'high', 'low', 'close')})
+
+
+def processed_data_key(rc, timeframe):
+    """Fingerprint of a processed file's inputs (raw file mtime + indicator settings), or None"""
+    raw_file = config.find_raw_data_file(timeframe)
+    if raw_file is None:
+        return None
+    return hashlib.blake2b(f"{os.path.getmtime(raw_file)}|{raw_file}|{rc.indicator_key()!r}".encode()).hexdigest()
+
+
+def processed_data_current(rc, timeframe, key=None):
+    """Whether the processed file on disk was built from the current raw data and indicator settings"""
+    processed_file = config.get_processed_file(timeframe)
+    meta_file = processed_file + ".meta"
+    if key is None:
+        key = processed_data_key(rc, timeframe)
+    if key is None or not os.path.exists(processed_file) or not os.path.exists(meta_file):
+        return False
+    with open(meta_file) as f:
+        return f.read().strip() == key
+
 
-def download_data(timeframe=None, timeframe_name=None):
+def save_processed_data(rc, df, timeframe, key=None):
+    """Save processed data with the fingerprint of its inputs (key: precomputed processed_data_key)"""
+    processed_file = config.get_processed_file(timeframe)
+    if key is None:
+        key = processed_data_key(rc, timeframe)
+    meta_file = processed_file + ".meta"
+    save_dataframe(df, processed_file)
+    if key is not None:
+        with open(meta_file, 'w') as f:
+            f.write(key)
+    emit(f"💾 Processed data saved: {processed_file} ({len(df)} candles)")
+
+
+def download_data(rc, timeframe=None, timeframe_name=None):
     """Download historical data from MT5"""
     if timeframe is None:
         timeframe = config.TIMEFRAME
     if timeframe_name is None:
         timeframe_name = config.get_timeframe_string(timeframe)
 
-    print("=" * 70)
-    print(f"DOWNLOADING {timeframe_name} DATA")
-    print("=" * 70)
+    from core.mt5_connector import MT5Connector
+
+    emit(_BANNER, f"DOWNLOADING {timeframe_name} DATA", _BANNER)
 
     connector = MT5Connector()
 
@@ -32,75 +150,89 @@ def download_data(timeframe=None, timeframe_name=None):
                 password=config.MT5_PASSWORD,
                 server=config.MT5_SERVER
         ):
-            print("\n❌ Could not connect to MT5")
+            emit("\n❌ Could not connect to MT5")
             return None
 
         df = connector.download_historical_data(
             symbol=config.SYMBOL,
             timeframe=timeframe,
-            start_date=config.DATA_START_DATE,
-            end_date=config.DATA_END_DATE
+            start_date=rc.data_start_date,
+            end_date=rc.data_end_date
         )
 
         if df is None:
             return None
 
         raw_file = config.get_raw_data_file(timeframe)
-        connector.save_to_csv(df, raw_file)
-        return df
+        if raw_file.endswith('.parquet'):
+            connector.save_to_parquet(df, raw_file)
+        else:
+            connector.save_to_csv(df, raw_file)
+        return to_price_dtype(df, rc.price_dtype)
 
     finally:
         connector.shutdown()
 
 
-def calculate_indicators(df, timeframe_name="H1"):
-    """Calculate all technical indicators"""
-    print("\n" + "=" * 70)
-    print(f"CALCULATING {timeframe_name} INDICATORS")
-    print("=" * 70)
+def calculate_indicators(rc, df, timeframe_name="H1", save_timeframe=None, save_key=None):
+    """Calculate all technical indicators (saved as save_timeframe's processed data if given)"""
+    from core.indicators import IndicatorCalculator
+
+    emit("", _BANNER, f"CALCULATING {timeframe_name} INDICATORS", _BANNER)
 
     calculator = IndicatorCalculator(
-        ema_period=config.EMA_PERIOD,
-        ema_mid=config.EMA_PERIOD_MID,
-        ema_long=config.EMA_PERIOD_LONG,
-        atr_period=config.ATR_PERIOD,
-        adx_period=config.ADX_PERIOD,
-        rsi_period=config.RSI_PERIOD,
-        macd_fast=config.MACD_FAST,
-        macd_slow=config.MACD_SLOW,
-        macd_signal=config.MACD_SIGNAL,
-        volume_sma=config.VOLUME_SMA_PERIOD,
-        atr_adjustment=config.ATR_ADJUSTMENT_FACTOR
+        ema_period=rc.ema_period,
+        ema_mid=rc.ema_period_mid,
+        ema_long=rc.ema_period_long,
+        atr_period=rc.atr_period,
+        adx_period=rc.adx_period,
+        rsi_period=rc.rsi_period,
+        macd_fast=rc.macd_fast,
+        macd_slow=rc.macd_slow,
+        macd_signal=rc.macd_signal,
+        volume_sma=rc.volume_sma_period,
+        atr_adjustment=rc.atr_adjustment_factor
     )
 
-    df_with_indicators = calculator.calculate_all_indicators(df)
-    calculator.get_indicator_summary(df_with_indicators)
+    df_with_indicators = calculator.calculate_all_indicators(df, timeframe_name)
+    calculator.get_indicator_summary(df_with_indicators, timeframe_name)
+
+    # Save the complete dataset (ALL indicators) right away, while the frame is still in cache
+    if save_timeframe is not None:
+        save_processed_data(rc, df_with_indicators, save_timeframe, save_key)
 
     return df_with_indicators
 
 
-def detect_setups(df, df_htf, start_date, end_date):
+def cached_indicators(rc, df, timeframe, timeframe_name="H1"):
+    """Indicators for df, loaded from the processed file instead when it is up to date"""
+    # Fingerprint the inputs once: checked here, and written with the file on a miss
+    key = processed_data_key(rc, timeframe)
+    if processed_data_current(rc, timeframe, key):
+        processed_file = config.get_processed_file(timeframe)
+        emit(f"\n📂 Loading {timeframe_name} indicators: {processed_file}")
+        # Same price dtype as a fresh calculation (a CSV file reads back as float64)
+        return to_price_dtype(load_dataframe(processed_file), rc.price_dtype)
+    return calculate_indicators(rc, df, timeframe_name, save_timeframe=timeframe, save_key=key)
+
+
+def detect_setups(rc, df, df_htf, start_date, end_date):
     """Detect trading setups"""
-    print("\n" + "=" * 70)
-    print("SETUP DETECTION")
-    print("=" * 70)
+    from core.setup_detector import SetupDetector
 
-    # Save processed DataFrame with ALL indicators (complete dataset)
-    processed_file = config.get_processed_file()
-    df.to_csv(processed_file, index=False)
-    print(f"💾 Processed data saved: {processed_file} ({len(df)} candles)")
+    emit("", _BANNER, "SETUP DETECTION", _BANNER)
 
     # Detect setups
     detector = SetupDetector(
         symbol=config.SYMBOL,
-        min_separation_pips=config.EMA_CROSS_MIN_SEPARATION,
-        stop_loss_pips=config.STOP_LOSS_PIPS,
-        use_di_h4_filter=config.USE_DI_H4_FILTER,
-        di_h4_min_diff=config.DI_H4_MIN_DIFF,
-        use_be_atr=config.USE_BE_ATR,
-        be_atr_multiplier=config.BE_ATR_MULTIPLIER,
-        use_tp_atr=config.USE_TP_ATR,
-        tp_atr_multiplier=config.TP_ATR_MULTIPLIER
+        min_separation_pips=rc.ema_cross_min_separation,
+        stop_loss_pips=rc.stop_loss_pips,
+        use_di_h4_filter=rc.use_di_h4_filter,
+        di_h4_min_diff=rc.di_h4_min_diff,
+        use_be_atr=rc.use_be_atr,
+        be_atr_multiplier=rc.be_atr_multiplier,
+        use_tp_atr=rc.use_tp_atr,
+        tp_atr_multiplier=rc.tp_atr_multiplier
     )
 
     setups = detector.detect_all_setups(
@@ -121,119 +253,146 @@ def detect_setups(df, df_htf, start_date, end_date):
     return setups
 
 
-def load_or_download_data(timeframe, timeframe_name):
+def load_or_download_data(rc, timeframe, timeframe_name):
     """Load existing data or download new"""
-    raw_file = config.get_raw_data_file(timeframe)
-
-    if os.path.exists(raw_file):
-        print(f"\n📂 Loading existing {timeframe_name} data: {raw_file}")
-        df = pd.read_csv(raw_file)
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        print(f"✅ {len(df)} candles loaded")
-        return df
+    import pandas as pd
+
+    raw_file = config.find_raw_data_file(timeframe)
+
+    if raw_file is not None:
+        emit(f"\n📂 Loading existing {timeframe_name} data: {raw_file}")
+        if raw_file.endswith('.parquet'):
+            df = pd.read_parquet(raw_file, engine='pyarrow')
+        else:
+            df = pd.read_csv(raw_file, dtype=RAW_CSV_DTYPES, parse_dates=['datetime'])
+        emit(f"✅ {timeframe_name}: {len(df)} candles loaded")
+        return to_price_dtype(df, rc.price_dtype)
     else:
-        return download_data(timeframe, timeframe_name)
+        return download_data(rc, timeframe, timeframe_name)
 
 
-def main():
-    """Complete pipeline: Download → Indicators → Detection"""
-    os.makedirs(config.DATA_FOLDER, exist_ok=True)
-    os.makedirs(config.RESULTS_FOLDER, exist_ok=True)
-    os.makedirs(config.LOGS_FOLDER, exist_ok=True)
+def should_redownload(path, mode, max_age_h=24):
+    """Whether to download raw data: always if missing, otherwise by mode (auto: older than max_age_h)"""
+    if path is None or mode == 'force':
+        return True
+    if mode == 'never':
+        return False
+    return time.time() - os.path.getmtime(path) > max_age_h * 3600
 
-    # Print filter configuration
-    print("\n" + "=" * 70)
-    print("ARMS v1.0 - FILTER CONFIGURATION")
-    print("=" * 70)
-    print(f"🔧 DI H4 Filter: {'ON' if config.USE_DI_H4_FILTER else 'OFF'} (min diff: {config.DI_H4_MIN_DIFF})")
-    print(f"🔧 BE ATR Filter: {'ON' if config.USE_BE_ATR else 'OFF'} (multiplier: {config.BE_ATR_MULTIPLIER})")
-    print(f"🔧 TP ATR Filter: {'ON' if config.USE_TP_ATR else 'OFF'} (multiplier: {config.TP_ATR_MULTIPLIER})")
-    print("=" * 70)
-
-    raw_file_h1 = config.get_raw_data_file(config.TIMEFRAME)
-    raw_file_h4 = config.get_raw_data_file(config.TIMEFRAME_HTF)
-
-    # Check if we need to re-download
-    if os.path.exists(raw_file_h1):
-        print(f"\n📂 Existing H1 data: {raw_file_h1}")
-        if config.USE_DI_H4_FILTER and os.path.exists(raw_file_h4):
-            print(f"📂 Existing H4 data: {raw_file_h4}")
-
-        response = input("\nRe-download data? (y/n): ").lower()
-
-        if response == 'y':
-            # Download H1
-            df_h1 = download_data(config.TIMEFRAME, "H1")
-            if df_h1 is None:
-                return
-
-            # Download H4 if filter is enabled
-            if config.USE_DI_H4_FILTER:
-                df_h4 = download_data(config.TIMEFRAME_HTF, "H4")
-                if df_h4 is None:
-                    return
-            else:
-                df_h4 = None
-        else:
-            # Load existing H1
-            df_h1 = load_or_download_data(config.TIMEFRAME, "H1")
-            if df_h1 is None:
-                return
-
-            # Load existing H4 if filter is enabled
-            if config.USE_DI_H4_FILTER:
-                df_h4 = load_or_download_data(config.TIMEFRAME_HTF, "H4")
-                if df_h4 is None:
-                    return
-            else:
-                df_h4 = None
+
+def run_symbol(rc, symbol, redownload='auto'):
+    """Download → Indicators → Detection for one symbol (returns the number of setups)"""
+    config.SYMBOL = symbol
+    raw_file_h1 = config.find_raw_data_file(config.TIMEFRAME)
+
+    if should_redownload(raw_file_h1, redownload, rc.raw_data_max_age_hours):
+        # Download H1 (and H4 if filter is enabled) concurrently: both mostly wait on the terminal
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            h1_future = pool.submit(download_data, rc, config.TIMEFRAME, "H1")
+            h4_future = pool.submit(download_data, rc, config.TIMEFRAME_HTF, "H4") if rc.use_di_h4_filter else None
+            df_h1 = h1_future.result()
+            df_h4 = h4_future.result() if h4_future is not None else None
+
+        if df_h1 is None or (rc.use_di_h4_filter and df_h4 is None):
+            return None
     else:
-        # Download H1
-        df_h1 = download_data(config.TIMEFRAME, "H1")
+        # Load existing H1
+        df_h1 = load_or_download_data(rc, config.TIMEFRAME, "H1")
         if df_h1 is None:
-            return
+            return None
 
-        # Download H4 if filter is enabled
-        if config.USE_DI_H4_FILTER:
-            df_h4 = download_data(config.TIMEFRAME_HTF, "H4")
+        # Load existing H4 if filter is enabled
+        if rc.use_di_h4_filter:
+            df_h4 = load_or_download_data(rc, config.TIMEFRAME_HTF, "H4")
             if df_h4 is None:
-                return
+                return None
         else:
             df_h4 = None
 
-    # Calculate indicators for H1
-    df_h1_processed = calculate_indicators(df_h1, "H1")
-
-    # Calculate indicators for H4 if needed
-    if config.USE_DI_H4_FILTER and df_h4 is not None:
-        df_h4_processed = calculate_indicators(df_h4, "H4")
-        # Save H4 processed data
-        processed_file_h4 = config.get_processed_file(config.TIMEFRAME_HTF)
-        df_h4_processed.to_csv(processed_file_h4, index=False)
-        print(f"💾 H4 processed data saved: {processed_file_h4}")
-    else:
-        df_h4_processed = None
+    # Calculate indicators for H1 (and H4 if needed) concurrently: the TA-Lib and numba (nogil)
+    # kernels release the GIL; on the pandas_ta fallback the two run one after the other.
+    # Up-to-date processed files are loaded instead of recomputed.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        h4_future = (pool.submit(cached_indicators, rc, df_h4, config.TIMEFRAME_HTF, "H4")
+                     if rc.use_di_h4_filter and df_h4 is not None else None)
+        df_h1_processed = cached_indicators(rc, df_h1, config.TIMEFRAME, "H1")
+        df_h4_processed = h4_future.result() if h4_future is not None else None
 
     # Detect setups
     setups = detect_setups(
+        rc,
         df_h1_processed,
         df_h4_processed,
-        config.ANALYSIS_START_DATE,
-        config.ANALYSIS_END_DATE
+        rc.analysis_start_date,
+        rc.analysis_end_date
     )
 
-    print("\n" + "=" * 70)
-    print("✅ PIPELINE COMPLETED")
-    print("=" * 70)
-    print("\n📁 Generated files:")
-    print(f"   1. {config.get_raw_data_file()} - Raw H1 data from MT5")
-    if config.USE_DI_H4_FILTER:
-        print(f"   2. {config.get_raw_data_file(config.TIMEFRAME_HTF)} - Raw H4 data from MT5")
-    print(f"   3. {config.get_processed_file()} - H1 candles with indicators")
-    if config.USE_DI_H4_FILTER:
-        print(f"   4. {config.get_processed_file(config.TIMEFRAME_HTF)} - H4 candles with indicators")
-    print(f"   5. {config.get_results_file(config.ANALYSIS_START_DATE, config.ANALYSIS_END_DATE)} - Detected setups")
-    print("=" * 70)
+    lines = ["", _BANNER, f"✅ PIPELINE COMPLETED - {symbol}", _BANNER, "\n📁 Generated files:",
+             f"   1. {config.get_raw_data_file()} - Raw H1 data from MT5"]
+    if rc.use_di_h4_filter:
+        lines.append(f"   2. {config.get_raw_data_file(config.TIMEFRAME_HTF)} - Raw H4 data from MT5")
+    lines.append(f"   3. {config.get_processed_file()} - H1 candles with indicators")
+    if rc.use_di_h4_filter:
+        lines.append(f"   4. {config.get_processed_file(config.TIMEFRAME_HTF)} - H4 candles with indicators")
+    lines.append(f"   5. {config.get_results_file(rc.analysis_start_date, rc.analysis_end_date)} - Detected setups")
+    lines.append(_BANNER)
+    emit(*lines)
+
+    return len(setups)
+
+
+def parse_args(argv=None):
+    """Command line options (each one overrides its config value for this run)"""
+    parser = argparse.ArgumentParser(description="ARMS v1.0 - Download → Indicators → Detection")
+    parser.add_argument('--redownload', choices=('auto', 'force', 'never'), default='auto',
+                        help="auto: download raw data only if missing or older than "
+                             f"{config.RAW_DATA_MAX_AGE_HOURS}h (default: auto)")
+    parser.add_argument('--symbol', nargs='+', help=f"symbol(s) to run (default: {' '.join(config.SYMBOLS)})")
+    parser.add_argument('--start', type=datetime.fromisoformat, help="analysis start date, YYYY-MM-DD")
+    parser.add_argument('--end', type=datetime.fromisoformat, help="analysis end date, YYYY-MM-DD")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Complete pipeline: Download → Indicators → Detection (every symbol in config.SYMBOLS)"""
+    args = parse_args(argv)
+    symbols = [symbol.upper() for symbol in args.symbol] if args.symbol else config.SYMBOLS
+
+    # Settings are read from config once; command line dates override the analysis period
+    overrides = {}
+    if args.start:
+        overrides['analysis_start_date'] = args.start
+    if args.end:
+        overrides['analysis_end_date'] = args.end
+    rc = RunConfig.from_config(**overrides)
+
+    os.makedirs(config.DATA_FOLDER, exist_ok=True)
+    os.makedirs(config.RESULTS_FOLDER, exist_ok=True)
+    os.makedirs(config.LOGS_FOLDER, exist_ok=True)
+
+    # Print filter configuration
+    emit(
+        "", _BANNER, "ARMS v1.0 - FILTER CONFIGURATION", _BANNER,
+        f"🔧 DI H4 Filter: {'ON' if rc.use_di_h4_filter else 'OFF'} (min diff: {rc.di_h4_min_diff})",
+        f"🔧 BE ATR Filter: {'ON' if rc.use_be_atr else 'OFF'} (multiplier: {rc.be_atr_multiplier})",
+        f"🔧 TP ATR Filter: {'ON' if rc.use_tp_atr else 'OFF'} (multiplier: {rc.tp_atr_multiplier})",
+        _BANNER
+    )
+
+    if len(symbols) == 1:
+        run_symbol(rc, symbols[0], args.redownload)
+        return
+
+    # Symbols are independent: run each pipeline in its own worker process (rc is passed along,
+    # so spawned workers do not depend on config state set up in this process)
+    with mp.Pool(min(len(symbols), mp.cpu_count())) as pool:
+        results = pool.starmap(run_symbol, [(rc, symbol, args.redownload) for symbol in symbols])
+
+    lines = ["", _BANNER, "✅ ALL SYMBOLS COMPLETED", _BANNER]
+    for symbol, n_setups in zip(symbols, results):
+        lines.append(f"   {symbol}: {'❌ failed' if n_setups is None else f'{n_setups} setups'}")
+    lines.append(_BANNER)
+    emit(*lines)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+"""Shared test helpers"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_ohlcv(n=2000, seed=1):
+    """Synthetic hourly OHLCV candles (random walk)"""
+    rng = np.random.default_rng(seed)
+    close = 1.12 * np.exp(np.cumsum(rng.normal(0, 0.0012, n)))
+    openp = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.0009, n))
+    return pd.DataFrame({
+        'datetime': pd.date_range('2021-01-01', periods=n, freq='h'),
+        'open': openp,
+        'high': np.maximum(openp, close) + spread * rng.random(n),
+        'low': np.minimum(openp, close) - spread * rng.random(n),
+        'close': close,
+        'volume': rng.integers(100, 5000, n),
+    })
+
+
+@pytest.fixture
+def ohlcv():
+    return make_ohlcv()
@@ -0,0 +1,13 @@
+from core.indicators import IndicatorCalculator, INDICATOR_COLUMNS
+
+
+def test_recalculating_a_processed_frame_replaces_its_indicators(ohlcv):
+    calculator = IndicatorCalculator()
+    processed = calculator.calculate_all_indicators(ohlcv)
+
+    again = calculator.calculate_all_indicators(processed)
+
+    assert not again.columns.duplicated().any()
+    assert list(again.columns) == list(processed.columns)
+    fresh = calculator.calculate_all_indicators(processed.drop(columns=list(INDICATOR_COLUMNS)))
+    assert again.equals(fresh)
@@ -0,0 +1,31 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("MetaTrader5")
+
+import config
+import main
+from conftest import make_ohlcv
+
+
+@pytest.mark.parametrize("data_format", ["csv", "parquet"])
+def test_processed_cache_hit_matches_miss(tmp_path, monkeypatch, data_format):
+    if data_format == "parquet":
+        pytest.importorskip("pyarrow")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "DATA_FORMAT", data_format)
+    os.makedirs(config.DATA_FOLDER)
+    os.makedirs(config.RESULTS_FOLDER)
+
+    raw = make_ohlcv()
+    main.save_dataframe(raw, config.get_raw_data_file(config.TIMEFRAME))
+    rc = main.RunConfig.from_config(price_dtype="float32")
+    df = main.to_price_dtype(raw, rc.price_dtype)
+
+    miss = main.cached_indicators(rc, df, config.TIMEFRAME, "H1")
+    assert main.processed_data_current(rc, config.TIMEFRAME)
+    hit = main.cached_indicators(rc, df, config.TIMEFRAME, "H1")
+
+    pd.testing.assert_frame_equal(hit, miss.reset_index(drop=True))